@@ -0,0 +1,48 @@
+# Generador de nombres de productos a partir de schemas JSON
+#
+# Los nombres públicos se importan desde su módulo recién cuando se usan: importar el
+# paquete no carga pymongo, openpyxl ni pyarrow. Uso como biblioteca:
+#
+#   from generador_nombres import cargar_schema, compilar_schema, generar_nombre_producto
+#   plan = compilar_schema(cargar_schema('schemas/laptops.json'))
+#   generar_nombre_producto(producto, plan).nombre_completo
+#
+# Línea de comandos: python -m generador_nombres {generar,validar,nombrar} --help
+import importlib
+
+# Nombres públicos de cada módulo del paquete
+EXPORTADOS = {
+    'config': ('MONGO_URI', 'DB_NAME', 'BATCH_SIZE', 'SCHEMAS_DIR'),
+    'schemas': ('cargar_schema', 'cargar_todos_los_schemas', 'validar_schema', 'validar_archivo_schema',
+                'quitar_comentarios', 'preparar_schema', 'validar_nombre_pestana', 'abrir_registro',
+                'recargar_registro', 'datos_del_registro'),
+    'motor': ('compilar_schema', 'generar_nombre_producto', 'generar_nombres_lote', 'ResultadoNombre',
+              'resultado_desde_dict', 'aplicar_transformacion', 'transformar_texto_cacheado', 'plural_a_singular',
+              'estadisticas_cache_transformaciones', 'limpiar_cache_resultados', 'iterar_lotes'),
+    'pipeline': ('crear_pipeline', 'resultado_desde_pipeline'),
+    'salidas': ('SALIDAS', 'formato_con_fragmentos', 'agregar_resultado'),
+    'mongo': ('conectar', 'agrupar_por_coleccion', 'consultar_coleccion', 'revisar_indices'),
+    'generacion': ('generar_salida_multi_schema', 'generar_salida_pipeline', 'generar_salida_productos',
+                   'leer_productos_json', 'verificar_paridad_pipeline'),
+    'checkpoint': ('generar_salida_con_checkpoint',),
+    'paralelo': ('generar_salida_multi_schema_paralelo',),
+    'servicio': ('ejecutar_servicio', 'nombrar_producto'),
+    'cli': ('main',),
+}
+
+_MODULO_DE = {nombre: modulo for modulo, nombres in EXPORTADOS.items() for nombre in nombres}
+
+__all__ = sorted(_MODULO_DE)
+
+# Importación diferida de los nombres públicos (PEP 562): el módulo se importa la
+# primera vez que se pide uno de sus nombres y el valor queda en el paquete
+def __getattr__(nombre):
+    modulo = _MODULO_DE.get(nombre)
+    if modulo is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {nombre!r}')
+    valor = getattr(importlib.import_module(f'.{modulo}', __name__), nombre)
+    globals()[nombre] = valor
+    return valor
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULO_DE))
@@ -0,0 +1,7 @@
+# python -m generador_nombres <subcomando> [opciones]
+import sys
+
+from .cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
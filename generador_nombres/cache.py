@@ -0,0 +1,141 @@
+# Cache SQLite de nombres generados (--cache e --incremental)
+import json
+import hashlib
+import sqlite3
+from datetime import datetime
+from .config import BATCH_SIZE
+from .motor import resultado_desde_dict, generar_nombre_producto, extraer_valores, generar_nombre_desde_valores
+
+# Función para abrir (o crear) el cache de nombres generados en un archivo SQLite
+# Guarda el resultado de cada producto por tipo junto con la huella de los campos que
+# lee el schema y la versión del schema, para no regenerar productos sin cambios.
+# orden es la clave de orden del _id (ver clave_orden_producto), para leer los
+# resultados en el mismo orden en que los devuelve la consulta
+def abrir_cache(ruta):
+    conexion = sqlite3.connect(ruta, timeout=30)
+    conexion.execute('PRAGMA journal_mode=WAL')
+    columnas = [fila[1] for fila in conexion.execute('PRAGMA table_info(nombres)')]
+    if columnas and 'orden' not in columnas:
+        # Cache de una versión anterior (sin el orden de los productos): se descarta
+        # junto con las marcas de agua, así la próxima ejecución consulta todo
+        conexion.execute('DROP TABLE nombres')
+        conexion.execute('DROP TABLE IF EXISTS marcas_agua')
+    conexion.execute("""
+        CREATE TABLE IF NOT EXISTS nombres (
+            tipo TEXT NOT NULL,
+            producto TEXT NOT NULL,
+            orden TEXT NOT NULL,
+            sku TEXT,
+            huella TEXT NOT NULL,
+            version TEXT NOT NULL,
+            resultado TEXT NOT NULL,
+            PRIMARY KEY (tipo, producto)
+        )""")
+    conexion.execute('CREATE INDEX IF NOT EXISTS nombres_orden ON nombres (tipo, version, orden)')
+    conexion.execute("""
+        CREATE TABLE IF NOT EXISTS marcas_agua (
+            tipo TEXT PRIMARY KEY,
+            version TEXT NOT NULL,
+            actualizado TEXT NOT NULL
+        )""")
+    conexion.commit()
+    return {
+        'conexion': conexion,
+        'pendientes': [],
+        'aciertos': 0,
+        'fallos': 0
+    }
+
+# Función para obtener una clave de texto que ordena los _id como MongoDB: números,
+# después strings y después el resto (ObjectId, cuyo hexadecimal ordena igual que sus bytes)
+def clave_orden_producto(producto_id):
+    if isinstance(producto_id, int) and not isinstance(producto_id, bool):
+        return f'1{producto_id + 2 ** 63:020d}'
+    if isinstance(producto_id, str):
+        return f'2{producto_id}'
+    return f'3{producto_id}'
+
+# Función para calcular la huella de un producto: hash del SKU y de los valores crudos
+# que leen los extractores del plan (no de los documentos proyectados, que cambian
+# según la proyección de la consulta)
+def calcular_huella(producto, valores):
+    datos = [producto.get('sku', ''), list(valores)]
+    contenido = json.dumps(datos, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+
+# Función para generar el nombre de un producto reutilizando el resultado del cache
+# si el producto y el schema no cambiaron desde la ejecución anterior
+def generar_nombre_con_cache(producto, plan, cache):
+    producto_id = producto.get('_id')
+    if producto_id is None:
+        return generar_nombre_producto(producto, plan)
+    
+    orden = clave_orden_producto(producto_id)
+    producto_id = str(producto_id)
+    valores = extraer_valores(producto, plan)
+    huella = calcular_huella(producto, valores)
+    fila = cache['conexion'].execute(
+        'SELECT huella, version, resultado FROM nombres WHERE tipo = ? AND producto = ?',
+        (plan['tipo'], producto_id)).fetchone()
+    
+    if fila is not None and fila[0] == huella and fila[1] == plan['version']:
+        cache['aciertos'] += 1
+        return resultado_desde_dict(json.loads(fila[2]), plan)
+    
+    cache['fallos'] += 1
+    resultado = generar_nombre_desde_valores(plan, valores)
+    cache['pendientes'].append((plan['tipo'], producto_id, orden, str(producto.get('sku', '')), huella,
+                                plan['version'], json.dumps(resultado.a_dict(), ensure_ascii=False)))
+    if len(cache['pendientes']) >= BATCH_SIZE:
+        guardar_cache(cache)
+    return resultado
+
+# Función para escribir en SQLite los resultados pendientes del cache
+def guardar_cache(cache):
+    if cache['pendientes']:
+        cache['conexion'].executemany(
+            'INSERT OR REPLACE INTO nombres (tipo, producto, orden, sku, huella, version, resultado) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)', cache['pendientes'])
+        cache['pendientes'] = []
+    cache['conexion'].commit()
+
+# Función para cerrar el cache guardando lo pendiente
+def cerrar_cache(cache):
+    guardar_cache(cache)
+    cache['conexion'].close()
+
+# Función para leer los resultados guardados de un tipo en orden de _id:
+# (producto, orden, sku, resultado)
+def leer_resultados_cache(cache, plan):
+    cursor = cache['conexion'].execute(
+        'SELECT producto, orden, sku, resultado FROM nombres WHERE tipo = ? AND version = ? ORDER BY orden',
+        (plan['tipo'], plan['version']))
+    for producto_id, orden, sku, resultado in cursor:
+        yield producto_id, orden, sku, resultado_desde_dict(json.loads(resultado), plan)
+
+# Función para leer los _id (como texto) de los productos guardados de un tipo
+def leer_productos_cache(cache, plan):
+    return [fila[0] for fila in cache['conexion'].execute('SELECT producto FROM nombres WHERE tipo = ?',
+                                                          (plan['tipo'],))]
+
+# Función para borrar del cache los resultados de un tipo de los productos indicados
+def eliminar_resultados_cache(cache, plan, productos_ids):
+    cache['conexion'].executemany('DELETE FROM nombres WHERE tipo = ? AND producto = ?',
+                                  [(plan['tipo'], producto_id) for producto_id in productos_ids])
+    cache['conexion'].commit()
+
+# Función para leer la última fecha updatedAt procesada de un tipo
+# Si el schema cambió desde entonces no hay marca de agua (hay que procesar todo)
+def leer_marca_agua(cache, plan):
+    fila = cache['conexion'].execute(
+        'SELECT version, actualizado FROM marcas_agua WHERE tipo = ?', (plan['tipo'],)).fetchone()
+    if fila is None or fila[0] != plan['version']:
+        return None
+    return datetime.fromisoformat(fila[1])
+
+# Función para guardar la última fecha updatedAt procesada de un tipo
+def guardar_marca_agua(cache, plan, actualizado):
+    cache['conexion'].execute(
+        'INSERT OR REPLACE INTO marcas_agua (tipo, version, actualizado) VALUES (?, ?, ?)',
+        (plan['tipo'], plan['version'], actualizado.isoformat()))
+    cache['conexion'].commit()
@@ -0,0 +1,213 @@
+# Puntos de control para reanudar una ejecución cortada (--checkpoint y --resume)
+import json
+import os
+import hashlib
+import pickle
+import shutil
+from bson import json_util
+from .config import BATCH_SIZE, TAMANO_LOTE_ESCRITURA
+from .motor import iterar_lotes
+from .cache import guardar_cache
+from .metricas import (
+    instante_actual, marcar_etapa, medir_etapa, medir_iterador, registrar_progreso, metricas_schema,
+    registrar_producto_schema
+)
+from .mongo import (
+    abrir_escritura_mongo, registrar_escritura_mongo, volcar_escritura_mongo, agrupar_por_coleccion,
+    consultar_coleccion
+)
+from .salidas import formato_con_fragmentos, agregar_resultado
+from .generacion import generar_resultado, pestanas_del_producto
+
+# Nombre del archivo de estado dentro del directorio de checkpoint
+ARCHIVO_ESTADO_CHECKPOINT = 'estado.json'
+
+# Función para calcular la firma de los schemas de una ejecución: un checkpoint solo se
+# puede reanudar con los mismos schemas (tipos, colecciones y versión de cada estructura)
+def firma_checkpoint(datos_schemas):
+    datos = [(schema_data['tipo'], schema_data['coleccion'], schema_data['plan']['version'])
+             for schema_data in datos_schemas]
+    return hashlib.sha1(json.dumps(datos).encode('utf-8')).hexdigest()
+
+# Función para leer el estado de un checkpoint (None si no existe)
+# Se usa json_util de bson para conservar el tipo de los _id (ObjectId, etc.)
+def leer_estado_checkpoint(directorio):
+    ruta = os.path.join(directorio, ARCHIVO_ESTADO_CHECKPOINT)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        return json_util.loads(archivo.read())
+
+# Función para guardar el estado de un checkpoint de forma atómica (archivo temporal + replace)
+def guardar_estado_checkpoint(directorio, estado):
+    ruta = os.path.join(directorio, ARCHIVO_ESTADO_CHECKPOINT)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as archivo:
+        archivo.write(json_util.dumps(estado))
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(ruta + '.tmp', ruta)
+
+# Función para guardar un punto de control: se escriben a disco las filas de cada schema,
+# se envían las escrituras pendientes y se registra el último _id procesado de la colección
+def guardar_punto_control(directorio, estado, pestanas, coleccion_nombre, ultimo_id, cache=None, escritura=None):
+    for indice, pestana in pestanas.items():
+        if pestana['filas']:
+            pickle.dump(pestana['filas'], pestana['archivo'], protocol=pickle.HIGHEST_PROTOCOL)
+            pestana['total'] += len(pestana['filas'])
+            pestana['filas'] = []
+        pestana['archivo'].flush()
+        os.fsync(pestana['archivo'].fileno())
+        estado['parciales'][indice] = {
+            'tamano': pestana['archivo'].tell(),
+            'total': pestana['total'],
+            'error': str(pestana['error']) if pestana['error'] is not None else None
+        }
+    if escritura is not None:
+        volcar_escritura_mongo(escritura)
+    if cache is not None:
+        guardar_cache(cache)
+    if ultimo_id is not None:
+        estado['colecciones'][coleccion_nombre]['ultimo_id'] = ultimo_id
+    guardar_estado_checkpoint(directorio, estado)
+
+# Función para generar la salida con checkpoints: los productos se consultan en orden de
+# _id y los resultados de cada schema se guardan en archivos parciales en directorio;
+# después de cada lote se registra el último _id procesado por colección. Si la ejecución
+# se corta, con reanudar=True se sigue desde ese _id (los parciales se recortan al último
+# punto de control) y al terminar se arma la salida desde los parciales, igual que si
+# no se hubiera cortado. El directorio se borra cuando la salida queda guardada
+def generar_salida_con_checkpoint(db, datos_schemas, nombre_archivo, directorio, reanudar=False, formato='xlsx',
+                                  cache=None, campo_escritura=None, tamano_lote_escritura=TAMANO_LOTE_ESCRITURA,
+                                  metricas=None, fragmentos=None):
+    firma = firma_checkpoint(datos_schemas)
+    estado = leer_estado_checkpoint(directorio) if os.path.isdir(directorio) else None
+    if estado is not None and not reanudar:
+        raise RuntimeError(f'Ya existe un checkpoint en {directorio}: usar --resume para continuar o borrarlo')
+    if estado is None and reanudar:
+        print(f'No hay checkpoint en {directorio}: se empieza desde el principio')
+    if estado is not None and estado['firma'] != firma:
+        raise RuntimeError(f'El checkpoint de {directorio} es de otros schemas (cambiaron desde la ejecución cortada)')
+    
+    if estado is None:
+        os.makedirs(directorio, exist_ok=True)
+        estado = {'firma': firma, 'colecciones': {}, 'parciales': {}}
+        guardar_estado_checkpoint(directorio, estado)
+    
+    # Abrir los parciales de cada schema recortando lo escrito después del último punto de control
+    pestanas = {}
+    for i, schema_data in enumerate(datos_schemas):
+        indice = str(i)
+        parcial = estado['parciales'].get(indice, {'tamano': 0, 'total': 0, 'error': None})
+        ruta = os.path.join(directorio, f'{indice}.pkl')
+        archivo = open(ruta, 'r+b' if os.path.exists(ruta) else 'w+b')
+        archivo.truncate(parcial['tamano'])
+        archivo.seek(parcial['tamano'])
+        pestanas[indice] = {
+            'indice': indice,
+            'plan': schema_data['plan'],
+            'ruta': ruta,
+            'archivo': archivo,
+            'filas': [],
+            'total': parcial['total'],
+            'error': parcial['error']
+        }
+        schema_data['pestana'] = pestanas[indice]
+    
+    try:
+        for coleccion_nombre, datos_grupo in agrupar_por_coleccion(datos_schemas).items():
+            progreso = estado['colecciones'].setdefault(coleccion_nombre, {'ultimo_id': None, 'terminada': False})
+            if progreso['terminada']:
+                print(f'\nColección {coleccion_nombre}: ya procesada en la ejecución anterior')
+                continue
+            
+            print(f'\nConsultando colección: {coleccion_nombre} ({len(datos_grupo)} schemas)')
+            if progreso['ultimo_id'] is not None:
+                print(f'   Reanudando después de _id {progreso["ultimo_id"]}')
+            pestanas_grupo = {schema_data['pestana']['indice']: schema_data['pestana'] for schema_data in datos_grupo}
+            pestanas_por_tipo = {}
+            for posicion, schema_data in enumerate(datos_grupo):
+                pestanas_por_tipo.setdefault(schema_data['tipo'], []).append(schema_data['pestana'])
+                schema_data['pestana']['posicion_escritura'] = posicion
+            escritura = None
+            if campo_escritura:
+                escritura = abrir_escritura_mongo(db[coleccion_nombre], campo_escritura, tamano_lote_escritura,
+                                                  [schema_data['tipo'] for schema_data in datos_grupo])
+            
+            productos = consultar_coleccion(db[coleccion_nombre], datos_grupo, campo_escritura=campo_escritura,
+                                            despues_de_id=progreso['ultimo_id'],
+                                            ordenar_por_id=True)
+            lotes = iterar_lotes(productos, BATCH_SIZE)
+            if metricas is not None:
+                lotes = medir_iterador(lotes, metricas, 'consulta')
+            
+            for lote in lotes:
+                if metricas is not None:
+                    registrar_progreso(metricas, len(lote))
+                    inicio = instante_actual()
+                for producto in lote:
+                    for pestana in pestanas_del_producto(producto, pestanas_por_tipo):
+                        if metricas is not None:
+                            inicio_producto = instante_actual()
+                        try:
+                            resultado = generar_resultado(producto, pestana['plan'], cache)
+                        except Exception as e:
+                            # Un error en un schema no detiene a los demás de la colección
+                            pestana['error'] = e
+                            continue
+                        pestana['filas'].append((producto.get('sku', ''), resultado))
+                        if escritura is not None:
+                            registrar_escritura_mongo(escritura, producto, resultado, pestana['posicion_escritura'])
+                        if metricas is not None:
+                            registrar_producto_schema(metricas_schema(metricas, pestana['plan']['tipo']), resultado,
+                                                      inicio_producto, instante_actual())
+                if metricas is not None:
+                    inicio = marcar_etapa(metricas, 'nombres', inicio)
+                guardar_punto_control(directorio, estado, pestanas_grupo, coleccion_nombre, lote[-1]['_id'],
+                                      cache, escritura)
+                if metricas is not None:
+                    marcar_etapa(metricas, 'checkpoint', inicio)
+            
+            progreso['terminada'] = True
+            guardar_punto_control(directorio, estado, pestanas_grupo, coleccion_nombre, None, cache, escritura)
+            if escritura is not None:
+                print(f'   Guardado en MongoDB ({campo_escritura}): {escritura["actualizados"]} actualizados, '
+                      f'{escritura["sin_cambios"]} sin cambios')
+    finally:
+        for pestana in pestanas.values():
+            pestana['archivo'].close()
+    
+    # Armar la salida desde los parciales, en el orden de los schemas
+    formato_salida = formato_con_fragmentos(formato, fragmentos)
+    salida = formato_salida['abrir'](nombre_archivo)
+    pestanas_creadas = 0
+    for schema_data in datos_schemas:
+        pestana_parcial = schema_data['pestana']
+        schema_data['total_productos'] = 0
+        if pestana_parcial['error'] is not None:
+            print(f'Error al procesar {schema_data["tipo"]}: {pestana_parcial["error"]}')
+            continue
+        
+        if pestana_parcial['total'] > 0:  # Solo crear pestaña si hay productos
+            with medir_etapa(metricas, 'escritura'):
+                pestana = formato_salida['crear_pestana'](salida, schema_data['plan'], schema_data['nombre_pestana'])
+                for sku, resultado in leer_filas_parciales(pestana_parcial['ruta']):
+                    agregar_resultado(pestana, sku, resultado)
+            with medir_etapa(metricas, 'guardado'):
+                schema_data['total_productos'] = formato_salida['cerrar_pestana'](pestana)
+            pestanas_creadas += 1
+        print(f'{schema_data["tipo"]}: {schema_data["total_productos"]} productos')
+    
+    with medir_etapa(metricas, 'guardado'):
+        formato_salida['guardar'](salida)
+    shutil.rmtree(directorio)
+    return pestanas_creadas
+
+# Función para leer las filas de un archivo parcial generado por un worker
+def leer_filas_parciales(ruta):
+    with open(ruta, 'rb') as archivo:
+        while True:
+            try:
+                filas = pickle.load(archivo)
+            except EOFError:
+                return
+            yield from filas
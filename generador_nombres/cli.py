@@ -0,0 +1,384 @@
+import os
+import sys
+import argparse
+from .config import DB_NAME, TAMANO_LOTE_ESCRITURA, FILAS_MAXIMAS_EXCEL, SCHEMAS_DIR, INTERVALO_RECARGA_SCHEMAS
+from .salidas import SALIDAS
+
+# Línea de comandos: python -m generador_nombres <subcomando> [opciones]
+# Cada subcomando importa sus módulos al ejecutarse, así validar y nombrar no cargan
+# pymongo ni openpyxl (salvo nombrar con --format xlsx)
+SUBCOMANDOS = ('generar', 'validar', 'nombrar')
+
+# Función para leer los argumentos de la línea de comandos
+# Sin subcomando se usa generar (python generar-nombres.py --format csv sigue funcionando)
+def parsear_argumentos(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv or argv[0] not in SUBCOMANDOS + ('-h', '--help'):
+        argv = ['generar', *argv]
+    
+    parser = argparse.ArgumentParser(prog='python -m generador_nombres',
+                                     description='Generador de Nombres de Productos - Múltiples Schemas')
+    subcomandos = parser.add_subparsers(dest='comando', metavar='SUBCOMANDO')
+    generar = subcomandos.add_parser('generar', help='Genera los nombres de los productos de MongoDB '
+                                                     '(subcomando por defecto)')
+    validar = subcomandos.add_parser('validar', help='Valida los schemas sin conectarse a MongoDB')
+    validar.add_argument('archivos', nargs='*', metavar='ARCHIVO',
+                         help='Schemas a validar (por defecto, todos los de la carpeta de --schemas)')
+    validar.add_argument('--vigilar', action='store_true',
+                         help='Sigue revisando la carpeta de --schemas y valida cada archivo nuevo o '
+                              'modificado hasta Ctrl+C')
+    validar.add_argument('--intervalo', type=float, default=INTERVALO_RECARGA_SCHEMAS,
+                         help='Segundos entre cada revisión con --vigilar')
+    nombrar = subcomandos.add_parser('nombrar', help='Genera los nombres de productos leídos de un archivo '
+                                                     'JSON, sin conectarse a MongoDB')
+    nombrar.add_argument('entrada', metavar='ARCHIVO',
+                         help='Archivo .json (un producto o una lista) o .jsonl (un producto por línea)')
+    nombrar.add_argument('--format', dest='formato', choices=sorted(SALIDAS), default='jsonl',
+                         help='Formato de salida (un archivo por schema, o una pestaña por schema con xlsx)')
+    nombrar.add_argument('--salida', metavar='ARCHIVO',
+                         help='Nombre base de la salida (por defecto productos_output.<formato>)')
+    nombrar.add_argument('--tipo', help='Solo usa el schema de este tipo')
+    nombrar.add_argument('--motor', choices=['python', 'columnas'], default='python',
+                         help='Motor de nombres (ver generar --motor)')
+    for subcomando in (generar, validar, nombrar):
+        subcomando.add_argument('--schemas', metavar='DIRECTORIO', dest='directorio_schemas', default=SCHEMAS_DIR,
+                                help='Carpeta de los schemas (por defecto general_archive/schemas)')
+    
+    generar.add_argument('--format', dest='formato', choices=sorted(SALIDAS), default='xlsx',
+                         help='Formato de salida: xlsx (una pestaña por schema) o csv/jsonl/parquet '
+                              '(un archivo por schema)')
+    generar.add_argument('--filas-por-pestana', type=int,
+                         help='Con xlsx, divide las filas de cada schema en pestañas numeradas de este tamaño '
+                              f'(siempre se dividen al llegar al límite de Excel, {FILAS_MAXIMAS_EXCEL} filas)')
+    generar.add_argument('--filas-por-archivo', type=int,
+                         help='Divide las filas de cada schema en archivos numerados de este tamaño '
+                              '(con xlsx, un workbook por fragmento) y escribe un manifiesto')
+    generar.add_argument('--mb-por-archivo', type=float,
+                         help='Con csv, jsonl o parquet, abre un archivo nuevo al pasar este tamaño en MB '
+                              '(aproximado) y escribe un manifiesto')
+    generar.add_argument('--workers', type=int, default=1,
+                         help='Cantidad de procesos para generar los nombres (1 = sin paralelismo)')
+    generar.add_argument('--productos-por-tarea', type=int, default=50000,
+                         help='Con --workers, los schemas con más productos se dividen en rangos de _id')
+    generar.add_argument('--hilos', type=int, default=0,
+                         help='Hilos que generan los nombres mientras otro hilo lee de MongoDB y el principal '
+                              'escribe la salida (0 = todo en secuencia)')
+    generar.add_argument('--cache', metavar='ARCHIVO',
+                         help='Archivo SQLite donde se guardan los nombres generados para reutilizarlos '
+                              'en productos sin cambios')
+    generar.add_argument('--incremental', action='store_true',
+                         help='Con --cache, consulta solo los productos con updatedAt posterior a la '
+                              'ejecución anterior y toma el resto del cache (no detecta productos eliminados)')
+    generar.add_argument('--escribir-mongo', metavar='CAMPO', dest='campo_escritura',
+                         help='Guarda el nombre generado en este campo de cada producto (y los campos '
+                              'faltantes en <CAMPO>Faltantes), omitiendo los que ya tienen el mismo valor')
+    generar.add_argument('--lote-escritura', type=int, default=TAMANO_LOTE_ESCRITURA,
+                         help='Cantidad de actualizaciones por bulk_write con --escribir-mongo')
+    generar.add_argument('--motor', choices=['python', 'columnas', 'pipeline'], default='python',
+                         help='python: genera los nombres en este proceso producto por producto; columnas: '
+                              'los genera por lotes, campo por campo; pipeline: los genera MongoDB con '
+                              'un aggregate compilado desde el schema')
+    generar.add_argument('--paridad', action='store_true',
+                         help='Compara los nombres del motor pipeline con los del motor python y termina '
+                              '(no genera la salida)')
+    generar.add_argument('--check-indexes', action='store_true', dest='revisar_indices',
+                         help='Analiza con explain() la consulta de cada schema (COLLSCAN o IXSCAN, '
+                              'documentos examinados y devueltos) y termina (no genera la salida)')
+    generar.add_argument('--create-indexes', action='store_true', dest='crear_indices',
+                         help='Con --check-indexes, crea el índice recomendado en las colecciones sin '
+                              'un índice sobre categorias.clave')
+    generar.add_argument('--checkpoint', metavar='DIRECTORIO',
+                         help='Guarda el avance (último _id por colección) y los resultados parciales en '
+                              'DIRECTORIO para poder reanudar una ejecución cortada')
+    generar.add_argument('--resume', action='store_true',
+                         help='Con --checkpoint, continúa la ejecución cortada desde el último punto de control')
+    generar.add_argument('--servicio', action='store_true',
+                         help='Inicia un servicio HTTP local que genera nombres a pedido (no genera la salida)')
+    generar.add_argument('--host', default='127.0.0.1', help='Dirección del servicio (con --servicio)')
+    generar.add_argument('--puerto', type=int, default=8765, help='Puerto del servicio (con --servicio)')
+    generar.add_argument('--recargar-schemas', type=float, default=INTERVALO_RECARGA_SCHEMAS, metavar='SEGUNDOS',
+                         help='Con --servicio, cada cuántos segundos se revisa la carpeta de schemas para '
+                              'recargar los archivos modificados (0 = no recargar)')
+    generar.add_argument('--metricas', metavar='ARCHIVO',
+                         help='Guarda en un archivo JSON los tiempos por etapa y por schema, los campos '
+                              'faltantes por schema y las tasas de aciertos de los caches')
+    generar.add_argument('--profile', metavar='ARCHIVO',
+                         help='Ejecuta con cProfile, guarda las estadísticas en ARCHIVO y muestra las '
+                              'funciones con más tiempo acumulado')
+    args = parser.parse_args(argv)
+    if args.comando == 'validar' and args.vigilar and (args.archivos or args.intervalo <= 0):
+        validar.error('--vigilar revisa la carpeta de --schemas (sin ARCHIVO) y requiere --intervalo mayor que 0')
+    if args.comando != 'generar':
+        return args
+    if args.recargar_schemas < 0:
+        generar.error('--recargar-schemas no puede ser negativo')
+    for opcion, valor in (('--filas-por-pestana', args.filas_por_pestana), ('--filas-por-archivo', args.filas_por_archivo),
+                          ('--mb-por-archivo', args.mb_por_archivo)):
+        if valor is not None and valor <= 0:
+            generar.error(f'{opcion} debe ser mayor que 0')
+    if args.filas_por_pestana and args.formato != 'xlsx':
+        generar.error('--filas-por-pestana solo se puede usar con --format xlsx')
+    if args.mb_por_archivo and args.formato == 'xlsx':
+        generar.error('--mb-por-archivo no se puede usar con --format xlsx (usar --filas-por-archivo)')
+    if args.lote_escritura < 1:
+        generar.error('--lote-escritura debe ser mayor que 0')
+    if args.incremental and not args.cache:
+        generar.error('--incremental requiere --cache')
+    if args.incremental and args.workers > 1:
+        generar.error('--incremental no se puede usar con --workers')
+    if args.crear_indices and not args.revisar_indices:
+        generar.error('--create-indexes requiere --check-indexes')
+    if args.resume and not args.checkpoint:
+        generar.error('--resume requiere --checkpoint')
+    if args.checkpoint and (args.workers > 1 or args.incremental or args.hilos or args.motor == 'pipeline'):
+        generar.error('--checkpoint no se puede usar con --workers, --incremental, --hilos ni --motor pipeline')
+    if args.hilos < 0:
+        generar.error('--hilos no puede ser negativo')
+    if args.hilos > 0 and (args.workers > 1 or args.cache or args.motor == 'pipeline'):
+        generar.error('--hilos no se puede usar con --workers, --cache ni --motor pipeline')
+    if args.motor == 'pipeline' and (args.workers > 1 or args.cache):
+        generar.error('--motor pipeline no se puede usar con --workers ni --cache')
+    if args.motor == 'columnas' and (args.cache or args.checkpoint):
+        generar.error('--motor columnas no se puede usar con --cache ni --checkpoint')
+    return args
+
+# Función principal: ejecuta el subcomando (con --profile, generar se ejecuta dentro de
+# cProfile). Devuelve el código de salida del proceso (None o 0 si terminó bien)
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    comando = {'generar': ejecutar, 'validar': ejecutar_validar, 'nombrar': ejecutar_nombrar}[args.comando]
+    if not getattr(args, 'profile', None):
+        return comando(args)
+    
+    import cProfile
+    import pstats
+    perfil = cProfile.Profile()
+    try:
+        return perfil.runcall(comando, args)
+    finally:
+        perfil.dump_stats(args.profile)
+        print(f'\nPerfil guardado en: {args.profile}')
+        pstats.Stats(perfil).sort_stats('cumulative').print_stats(20)
+
+# Función que ejecuta el proceso completo con los argumentos ya leídos
+def ejecutar(args):
+    from .schemas import abrir_registro, imprimir_registro, datos_del_registro
+    from .cache import abrir_cache, cerrar_cache
+    from .metricas import crear_metricas, resumir_metricas, guardar_metricas, estadisticas_caches
+    from .mongo import conectar, revisar_indices
+    from .generacion import generar_salida_multi_schema, generar_salida_pipeline, verificar_paridad_pipeline
+    from .checkpoint import generar_salida_con_checkpoint
+    from .paralelo import generar_salida_multi_schema_paralelo
+    from .servicio import ejecutar_servicio
+    
+    metricas = crear_metricas()
+    try:
+        print('=' * 60)
+        print('Generador de Nombres de Productos - Múltiples Schemas')
+        print('=' * 60)
+        
+        # Cargar, validar y compilar todos los schemas antes de conectarse (los archivos
+        # sin cambios se toman del cache de la carpeta)
+        print(f'\nCargando schemas desde: {args.directorio_schemas}')
+        registro = abrir_registro(args.directorio_schemas)
+        imprimir_registro(registro)
+        datos_schemas = datos_del_registro(registro)
+        
+        if not datos_schemas:
+            print('\nNo se encontraron schemas válidos para procesar')
+            return
+        
+        print(f'\nTotal de schemas cargados: {len(datos_schemas)}')
+        
+        # Conectar a MongoDB
+        print('\nConectando a MongoDB...')
+        client = conectar()
+        print('Conectado exitosamente')
+        
+        db = client[DB_NAME]
+        
+        # Servicio de nombres a pedido (schemas compilados y conexión reutilizada); los
+        # schemas modificados se recargan sin reiniciarlo
+        if args.servicio and datos_schemas:
+            ejecutar_servicio(db, datos_schemas, args.host, args.puerto, registro, args.recargar_schemas)
+            return
+        
+        # Revisar los planes de las consultas por tipo sin generar la salida
+        if args.revisar_indices and datos_schemas:
+            print('\nRevisando índices y planes de consulta...')
+            recorridos_completos = revisar_indices(db, datos_schemas, args.crear_indices)
+            print(f'\nÍndices: {"OK" if recorridos_completos == 0 else f"{recorridos_completos} consultas recorren toda la colección (COLLSCAN)"}')
+            return
+        
+        # Comparar los motores python y pipeline sin generar la salida
+        if args.paridad and datos_schemas:
+            print('\nVerificando paridad del motor pipeline...')
+            diferencias = verificar_paridad_pipeline(db, datos_schemas)
+            print(f'\nParidad: {"OK" if diferencias == 0 else f"{diferencias} diferencias"}')
+            return
+        
+        # Generar Excel con múltiples pestañas, procesando los productos en streaming
+        if datos_schemas:
+            nombre_archivo = f'productos_output.{args.formato}'
+            fragmentos = {
+                'filas_por_pestana': args.filas_por_pestana,
+                'filas_por_archivo': args.filas_por_archivo,
+                'bytes_por_archivo': int(args.mb_por_archivo * 1024 * 1024) if args.mb_por_archivo else None
+            }
+            print(f'\nGenerando salida {args.formato}: {nombre_archivo}')
+            if args.motor == 'pipeline':
+                cache = None
+                pestanas_creadas = generar_salida_pipeline(
+                    db, datos_schemas, nombre_archivo, args.formato, args.campo_escritura,
+                    args.lote_escritura, metricas, fragmentos)
+            elif args.workers > 1:
+                cache = None
+                pestanas_creadas = generar_salida_multi_schema_paralelo(
+                    db, datos_schemas, nombre_archivo, args.workers, args.productos_por_tarea,
+                    args.formato, args.cache, args.campo_escritura, args.lote_escritura, metricas,
+                    args.motor == 'columnas', fragmentos)
+                if args.cache:
+                    cache_workers = metricas['caches'].get('nombres', {'aciertos': 0, 'fallos': 0})
+                    print(f'  Cache: {cache_workers["aciertos"]} reutilizados, {cache_workers["fallos"]} generados')
+            else:
+                cache = abrir_cache(args.cache) if args.cache else None
+                try:
+                    if args.checkpoint:
+                        pestanas_creadas = generar_salida_con_checkpoint(
+                            db, datos_schemas, nombre_archivo, args.checkpoint, args.resume, args.formato,
+                            cache, args.campo_escritura, args.lote_escritura, metricas, fragmentos)
+                    else:
+                        pestanas_creadas = generar_salida_multi_schema(
+                            db, datos_schemas, nombre_archivo, args.formato, cache, args.incremental,
+                            args.campo_escritura, args.lote_escritura, metricas, args.hilos,
+                            args.motor == 'columnas', fragmentos)
+                finally:
+                    if cache is not None:
+                        print(f'  Cache: {cache["aciertos"]} reutilizados, {cache["fallos"]} generados')
+                        cerrar_cache(cache)
+            resumen = resumir_metricas(metricas, cache)
+            total_productos = sum(d['total_productos'] for d in datos_schemas)
+            
+            print('\n' + '-' * 60)
+            print('Procesamiento completado')
+            print(f'  Total de schemas procesados: {len(datos_schemas)}')
+            print(f'  Total de productos: {total_productos}')
+            print('-' * 60)
+            
+            print(f'\nSalida {args.formato} generada exitosamente')
+            print(f'  Pestañas creadas: {pestanas_creadas}')
+            print(f'  Total de productos procesados: {total_productos}')
+            print(f'  Tiempo total: {resumen["segundos"]} s ({resumen["productos_por_segundo"]} productos/s)')
+            for etapa, datos in resumen['etapas'].items():
+                print(f'  Etapa {etapa}: {datos["segundos"]} s (CPU {datos["cpu"]} s)')
+            for nombre, info in estadisticas_caches(metricas).items():
+                if nombre != 'nombres':  # El cache de nombres ya se mostró arriba
+                    print(f'  Cache de {nombre}: {info["aciertos"]} aciertos, {info["fallos"]} fallos')
+            
+            if args.metricas:
+                guardar_metricas(resumen, args.metricas)
+                print(f'  Métricas guardadas en: {args.metricas}')
+        else:
+            print('\nNo se encontraron productos para generar la salida')
+        
+    except Exception as error:
+        print(f'\nError: {error}')
+        import traceback
+        traceback.print_exc()
+        if args.checkpoint and os.path.isdir(args.checkpoint):
+            print(f'\nEl avance quedó guardado en {args.checkpoint}: usar --checkpoint {args.checkpoint} --resume para continuar')
+    finally:
+        if 'client' in locals():
+            client.close()
+            print('\nConexión cerrada')
+
+# Función para obtener los problemas de los schemas a validar: {archivo: errores}
+# Los archivos indicados se validan uno por uno; sin archivos se usa el registro de la
+# carpeta, sin su cache (validar no escribe archivos)
+def errores_a_validar(args):
+    from .schemas import validar_archivo_schema, abrir_registro
+    
+    if not args.archivos:
+        registro = abrir_registro(args.directorio_schemas, usar_cache=False)
+        return {nombre: entrada['errores'] for nombre, entrada in registro['archivos'].items()}
+    
+    errores_por_archivo = {}
+    for archivo in args.archivos:
+        try:
+            errores_por_archivo[archivo] = validar_archivo_schema(archivo)
+        except OSError as e:
+            errores_por_archivo[archivo] = [f'No se pudo leer: {e}']
+    return errores_por_archivo
+
+# Función que revisa la carpeta de schemas cada intervalo segundos y muestra el estado
+# de los archivos nuevos, modificados o eliminados (validar --vigilar), hasta Ctrl+C
+def vigilar_schemas_validar(args):
+    import time
+    from .schemas import abrir_registro, recargar_registro, imprimir_registro
+    
+    registro = abrir_registro(args.directorio_schemas, usar_cache=False)
+    print(f'\nRevisando {args.directorio_schemas} cada {args.intervalo} s (Ctrl+C para terminar)')
+    try:
+        while True:
+            time.sleep(args.intervalo)
+            cambios = recargar_registro(registro)
+            if cambios:
+                imprimir_registro(registro, [nombre for nombre, _ in cambios])
+    except KeyboardInterrupt:
+        print('\nRevisión detenida')
+    return 1 if any(entrada['errores'] for entrada in registro['archivos'].values()) else 0
+
+# Función que valida los schemas sin conectarse a MongoDB (subcomando validar)
+# Devuelve 1 si algún schema tiene problemas
+def ejecutar_validar(args):
+    errores_por_archivo = errores_a_validar(args)
+    if not errores_por_archivo:
+        print(f'No se encontraron schemas en: {args.directorio_schemas}')
+        return 1
+    
+    invalidos = 0
+    for archivo, errores in errores_por_archivo.items():
+        if errores:
+            invalidos += 1
+            print(f'{os.path.basename(archivo)}: inválido')
+            for error in errores:
+                print(f'  - {error}')
+        else:
+            print(f'{os.path.basename(archivo)}: OK')
+    
+    print(f'\n{len(errores_por_archivo) - invalidos} de {len(errores_por_archivo)} schemas válidos')
+    if args.vigilar:
+        return vigilar_schemas_validar(args)
+    return 1 if invalidos else 0
+
+# Función que genera los nombres de productos leídos de un archivo JSON o JSON Lines
+# (subcomando nombrar). No usa MongoDB; openpyxl solo se carga con --format xlsx
+def ejecutar_nombrar(args):
+    from .schemas import abrir_registro, imprimir_registro, datos_del_registro
+    from .generacion import leer_productos_json, generar_salida_productos
+    
+    registro = abrir_registro(args.directorio_schemas)
+    imprimir_registro(registro)
+    datos_schemas = datos_del_registro(registro)
+    if args.tipo is not None:
+        datos_schemas = [schema_data for schema_data in datos_schemas if schema_data['tipo'] == args.tipo]
+    if not datos_schemas:
+        print(f'No hay schemas para el tipo: {args.tipo}' if args.tipo else 'No se encontraron schemas válidos')
+        return 1
+    
+    nombre_archivo = args.salida or f'productos_output.{args.formato}'
+    print(f'\nGenerando salida {args.formato}: {nombre_archivo}')
+    try:
+        pestanas_creadas = generar_salida_productos(leer_productos_json(args.entrada), datos_schemas,
+                                                    nombre_archivo, args.formato, columnas=args.motor == 'columnas')
+    except (OSError, ValueError) as e:
+        print(f'Error al leer {args.entrada}: {e}')
+        return 1
+    total_productos = sum(schema_data['total_productos'] for schema_data in datos_schemas)
+    print(f'\nSalida {args.formato} generada: {pestanas_creadas} pestañas, {total_productos} productos')
+    return 0
+
+# Ejecutar
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import os
+
+# Configuración
+MONGO_URI = 'MONGO_URI PARA LA BDD EN PRODUCCION'
+DB_NAME = 'development'
+# Cantidad de productos que se piden a MongoDB por lote y se procesan juntos
+BATCH_SIZE = 1000
+# Tamaño máximo de los caches de transformaciones de texto y de palabras en singular
+TAMANO_CACHE_TRANSFORMACIONES = 10000
+TAMANO_CACHE_PALABRAS = 10000
+# Tamaño máximo del cache de resultados por valores crudos (productos con los mismos campos)
+TAMANO_CACHE_RESULTADOS = 10000
+# Cantidad de actualizaciones por bulk_write al guardar los nombres en MongoDB
+TAMANO_LOTE_ESCRITURA = 1000
+# Segundos entre las líneas de progreso mientras se procesan productos
+INTERVALO_PROGRESO = 10
+# Lotes que pueden esperar en cada cola entre los hilos de --hilos (limita la memoria)
+TAMANO_COLA_LOTES = 4
+# Filas de datos que entran en una hoja de Excel (1.048.576 filas menos el encabezado)
+FILAS_MAXIMAS_EXCEL = 1048575
+# Cada cuántas filas se revisa el tamaño en bytes del archivo de un fragmento
+FILAS_ENTRE_CONTROLES_TAMANO = 100
+# Índice recomendado para las consultas por tipo (multikey sobre categorias.clave);
+# con updatedAt también lo aprovechan las consultas de --incremental
+INDICE_RECOMENDADO = [('categorias.clave', 1), ('updatedAt', 1)]
+
+# Carpeta de schemas por defecto (general_archive/schemas en la raíz del repositorio);
+# se puede cambiar con --schemas
+PAQUETE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMAS_DIR = os.path.join(os.path.dirname(PAQUETE_DIR), 'general_archive', 'schemas')
+# Carpeta del usuario donde se guardan los schemas ya leídos y validados (un archivo por
+# carpeta de schemas); nunca se escribe en la carpeta de los schemas
+DIRECTORIO_CACHE_SCHEMAS = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                                        'generador_nombres')
+# Segundos entre cada revisión de la carpeta de schemas en el servicio y en validar --vigilar
+INTERVALO_RECARGA_SCHEMAS = 2
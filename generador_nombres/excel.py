@@ -0,0 +1,244 @@
+# Salida Excel con openpyxl (workbook write-only con estilos con nombre)
+import os
+import shutil
+import zipfile
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment, NamedStyle
+from openpyxl.utils import get_column_letter, column_index_from_string
+from .config import BATCH_SIZE
+from .motor import iterar_lotes
+from .generacion import escribir_producto
+
+# Nombres de los estilos del Excel (se registran una vez por workbook)
+ESTILO_ENCABEZADO = 'encabezado'
+ESTILO_FILA_COMPLETA = 'fila_completa'
+ESTILO_FILA_FALTANTE = 'fila_faltante'
+ESTILO_CELDA_FALTANTE = 'celda_faltante'
+
+# Función para registrar los estilos con nombre del Excel en un workbook
+# Las celdas solo referencian el estilo por nombre, sin crear objetos de estilo por celda
+def registrar_estilos_excel(wb):
+    estilos = [
+        NamedStyle(name=ESTILO_ENCABEZADO,
+                   fill=PatternFill(start_color="4CAF50", end_color="4CAF50", fill_type="solid"),
+                   font=Font(bold=True, color="FFFFFF"),
+                   alignment=Alignment(horizontal='center', vertical='center')),
+        NamedStyle(name=ESTILO_FILA_COMPLETA,
+                   fill=PatternFill(start_color="D4EDDA", end_color="D4EDDA", fill_type="solid")),
+        NamedStyle(name=ESTILO_FILA_FALTANTE,
+                   fill=PatternFill(start_color="FFF3CD", end_color="FFF3CD", fill_type="solid")),
+        NamedStyle(name=ESTILO_CELDA_FALTANTE,
+                   fill=PatternFill(start_color="FFC107", end_color="FFC107", fill_type="solid"),
+                   font=Font(bold=True)),
+    ]
+    for estilo in estilos:
+        if estilo.name not in wb.named_styles:
+            wb.add_named_style(estilo)
+
+# Ancho máximo de una columna del Excel (el ancho es el largo del contenido + 2)
+ANCHO_MAXIMO_COLUMNA = 50
+
+# Función para actualizar el largo máximo de cada columna con los valores de una fila
+# Las columnas que ya llegaron al ancho máximo no se vuelven a medir
+def actualizar_anchos(anchos, valores):
+    tope = ANCHO_MAXIMO_COLUMNA - 2
+    for col, valor in enumerate(valores):
+        if anchos[col] < tope:
+            largo = len(valor) if isinstance(valor, str) else len(str(valor))
+            if largo > anchos[col]:
+                anchos[col] = largo
+
+# Función para crear una celda con valor y estilo con nombre
+def crear_celda(ws, valor, estilo):
+    cell = WriteOnlyCell(ws, value=valor)
+    cell.style = estilo
+    return cell
+
+# Función para preparar una pestaña de Excel: título, estilos y encabezados
+# Devuelve el estado de escritura de la pestaña, que se usa al agregar productos.
+# Las filas se agregan con ws.append, así que sirve tanto para workbooks normales
+# como write-only (openpyxl.Workbook(write_only=True)). Con ws None la hoja se crea
+# recién al llegar la primera fila (ver crear_hoja_excel)
+def iniciar_pestana_excel(ws, plan, nombre_pestana):
+    # Encabezados precalculados en el plan del schema
+    headers = plan['encabezados']
+    
+    pestana = {
+        'ws': None,
+        'plan': plan,
+        'nombre_pestana': nombre_pestana,
+        'total': 0,
+        'agregar': agregar_resultado_excel,
+        # Largo máximo del contenido de cada columna (incluye los encabezados),
+        # se actualiza con cada fila para ajustar el ancho al cerrar sin releer la hoja
+        'anchos': [len(str(header)) for header in headers]
+    }
+    if ws is not None:
+        asignar_hoja_excel(pestana, ws)
+    return pestana
+
+# Función para asignar la hoja de una pestaña: le pone el título y escribe los encabezados
+def asignar_hoja_excel(pestana, ws):
+    ws.title = pestana['nombre_pestana']
+    registrar_estilos_excel(ws.parent)
+    ws.append([crear_celda(ws, header, ESTILO_ENCABEZADO) for header in pestana['plan']['encabezados']])
+    pestana['ws'] = ws
+
+# Función para crear la hoja de una pestaña de la salida Excel, en la posición que le toca
+# según el orden de salida['pestanas'] (las pestañas de los schemas se llenan intercaladas)
+# Se llama con la primera fila, así una pestaña vacía que se descarta nunca crea su hoja
+# ni el archivo temporal de la hoja write-only
+def crear_hoja_excel(pestana):
+    salida = pestana['salida']
+    indice = 0
+    for otra in salida['pestanas']:
+        if otra is pestana:
+            break
+        if otra['ws'] is not None:
+            indice += 1
+    asignar_hoja_excel(pestana, salida['wb'].create_sheet(pestana['nombre_pestana'], indice))
+    return pestana['ws']
+
+# Función para convertir un resultado de generar_nombre_producto en valores y estilos
+def crear_fila_resultado(sku, resultado):
+    # Determinar estilo de fila
+    estilo_fila = ESTILO_FILA_FALTANTE if resultado.faltantes else ESTILO_FILA_COMPLETA
+    
+    # SKU y nombre completo
+    valores = [sku, resultado.nombre_completo]
+    estilos = [estilo_fila, estilo_fila]
+    
+    # Partes individuales
+    for i, valor in enumerate(resultado.valores):
+        valores.append(valor or '')
+        # Si la celda tiene dato faltante, aplicar estilo especial
+        estilos.append(ESTILO_CELDA_FALTANTE if resultado.falta(i) else estilo_fila)
+    
+    return valores, estilos
+
+# Función para agregar una fila ya calculada a la pestaña
+def agregar_fila_excel(pestana, valores, estilos):
+    ws = pestana['ws']
+    if ws is None:
+        ws = crear_hoja_excel(pestana)
+    actualizar_anchos(pestana['anchos'], valores)
+    ws.append([crear_celda(ws, valor, estilo) for valor, estilo in zip(valores, estilos)])
+
+# Función para agregar el resultado de un producto como fila de la pestaña
+def agregar_resultado_excel(pestana, sku, resultado):
+    valores, estilos = crear_fila_resultado(sku, resultado)
+    agregar_fila_excel(pestana, valores, estilos)
+
+# Función para terminar una pestaña: calcula el ancho de columnas
+# En workbooks normales el ancho se aplica directamente; en write-only se guarda en
+# pestana['anchos_columnas'] para aplicarlo con aplicar_anchos_columnas después de guardar.
+# Devuelve la cantidad de productos escritos
+def cerrar_pestana_excel(pestana):
+    ws = pestana['ws']
+    if ws is None:
+        ws = crear_hoja_excel(pestana)
+    anchos_columnas = {get_column_letter(col): min(largo + 2, ANCHO_MAXIMO_COLUMNA)
+                       for col, largo in enumerate(pestana['anchos'], 1)}
+    
+    if ws.parent.write_only:
+        pestana['anchos_columnas'] = anchos_columnas
+    else:
+        for column_letter, adjusted_width in anchos_columnas.items():
+            ws.column_dimensions[column_letter].width = adjusted_width
+    
+    return pestana['total']
+
+# Función para descartar una pestaña de la salida Excel (workbook write-only o normal)
+# Una pestaña sin filas todavía no tiene hoja. Si ya tenía filas, la hoja write-only se
+# cierra y su archivo temporal lo borra openpyxl al terminar el proceso
+def eliminar_pestana_excel(salida, pestana):
+    salida['pestanas'] = [otra for otra in salida['pestanas'] if otra is not pestana]
+    ws = pestana['ws']
+    if ws is None:
+        return
+    if salida['wb'].write_only:
+        ws.close()
+    salida['wb'].remove(ws)
+
+# Función para insertar los anchos de columna en un .xlsx ya guardado
+# En modo write-only openpyxl escribe <cols> antes de la primera fila, cuando los
+# anchos todavía no se conocen; aquí se agregan copiando el archivo por bloques.
+# anchos_por_hoja: {ruta de la hoja en el zip: {letra de columna: ancho}}
+def aplicar_anchos_columnas(nombre_archivo, anchos_por_hoja):
+    temporal = nombre_archivo + '.tmp'
+    with zipfile.ZipFile(nombre_archivo) as origen, \
+            zipfile.ZipFile(temporal, 'w', zipfile.ZIP_DEFLATED) as destino:
+        for info in origen.infolist():
+            anchos = anchos_por_hoja.get(info.filename)
+            with origen.open(info) as entrada, \
+                    destino.open(info, 'w', force_zip64=info.file_size > 1 << 30) as salida:
+                if anchos:
+                    insertar_cols_xml(entrada, salida, anchos)
+                else:
+                    shutil.copyfileobj(entrada, salida)
+    os.replace(temporal, nombre_archivo)
+
+# Función para copiar el XML de una hoja agregando <cols> justo antes de <sheetData>
+def insertar_cols_xml(entrada, salida, anchos):
+    cols = ''.join(
+        f'<col min="{column_index_from_string(letra)}" max="{column_index_from_string(letra)}" '
+        f'width="{ancho}" customWidth="1"/>'
+        for letra, ancho in anchos.items()
+    )
+    marca = b'<sheetData'
+    pendiente = b''
+    while True:
+        bloque = entrada.read(1 << 20)
+        if not bloque:
+            salida.write(pendiente)
+            return
+        pendiente += bloque
+        posicion = pendiente.find(marca)
+        if posicion != -1:
+            salida.write(pendiente[:posicion])
+            salida.write(f'<cols>{cols}</cols>'.encode('utf-8'))
+            salida.write(pendiente[posicion:])
+            shutil.copyfileobj(entrada, salida)
+            return
+        # Conservar el final por si la marca quedó partida entre bloques
+        salida.write(pendiente[:-len(marca)])
+        pendiente = pendiente[-len(marca):]
+
+# Función para generar una pestaña de Excel para un schema específico
+# productos puede ser cualquier iterable (ej: un cursor); devuelve la cantidad de filas escritas
+def generar_pestana_excel(ws, productos, plan, nombre_pestana):
+    pestana = iniciar_pestana_excel(ws, plan, nombre_pestana)
+    for lote in iterar_lotes(productos, BATCH_SIZE):
+        for producto in lote:
+            escribir_producto(pestana, producto)
+    return cerrar_pestana_excel(pestana)
+
+# Función para abrir la salida Excel: un workbook write-only con una pestaña por schema
+def abrir_salida_excel(nombre_archivo):
+    return {
+        'wb': openpyxl.Workbook(write_only=True),
+        'nombre_archivo': nombre_archivo,
+        'pestanas': []
+    }
+
+# Función para crear la pestaña de un schema en la salida Excel
+# La hoja se crea con la primera fila (ver crear_hoja_excel)
+def crear_pestana_salida_excel(salida, plan, nombre_pestana):
+    pestana = iniciar_pestana_excel(None, plan, nombre_pestana)
+    pestana['salida'] = salida
+    salida['pestanas'].append(pestana)
+    return pestana
+
+# Función para guardar la salida Excel
+def guardar_salida_excel(salida):
+    guardar_excel(salida['wb'], salida['pestanas'], salida['nombre_archivo'])
+
+# Función para guardar un workbook write-only y aplicar los anchos de columna calculados
+def guardar_excel(wb, pestanas, nombre_archivo):
+    wb.save(nombre_archivo)
+    anchos_por_hoja = {}
+    for pestana in pestanas:
+        if 'anchos_columnas' in pestana:
+            anchos_por_hoja[pestana['ws'].path.lstrip('/')] = pestana['anchos_columnas']
+    aplicar_anchos_columnas(nombre_archivo, anchos_por_hoja)
@@ -0,0 +1,594 @@
+# Generación de la salida: reparte los productos entre las pestañas de sus schemas
+import json
+import heapq
+import queue
+import threading
+from datetime import datetime
+from .config import BATCH_SIZE, TAMANO_LOTE_ESCRITURA, TAMANO_COLA_LOTES
+from .motor import generar_nombre_producto, generar_nombres_lote, iterar_lotes
+from .pipeline import crear_pipeline, resultado_desde_pipeline
+from .cache import (
+    generar_nombre_con_cache, guardar_cache, leer_resultados_cache, leer_marca_agua, guardar_marca_agua,
+    clave_orden_producto, leer_productos_cache, eliminar_resultados_cache
+)
+from .metricas import (
+    crear_metricas, instante_actual, marcar_etapa, medir_etapa, medir_iterador, metricas_schema,
+    registrar_producto_schema, registrar_lote_schema, combinar_metricas, registrar_progreso
+)
+from .mongo import (
+    abrir_escritura_mongo, registrar_escritura_mongo, volcar_escritura_mongo, agrupar_por_coleccion,
+    consultar_coleccion
+)
+from .salidas import formato_con_fragmentos, agregar_resultado
+
+# Función para generar el nombre de un producto (con cache, el resultado se reutiliza
+# si el producto no cambió)
+def generar_resultado(producto, plan, cache=None):
+    if cache is not None:
+        return generar_nombre_con_cache(producto, plan, cache)
+    return generar_nombre_producto(producto, plan)
+
+# Función para generar el nombre de un producto y escribirlo en la pestaña
+# Con métricas suma el tiempo de cada etapa y los campos faltantes del schema
+def escribir_producto(pestana, producto):
+    metricas = pestana.get('metricas')
+    if metricas is None:
+        resultado = generar_resultado(producto, pestana['plan'], pestana.get('cache'))
+        escribir_resultado_producto(pestana, producto, resultado)
+        return
+    
+    inicio = instante_actual()
+    resultado = generar_resultado(producto, pestana['plan'], pestana.get('cache'))
+    instante = marcar_etapa(metricas, 'nombres', inicio)
+    instante = escribir_resultado_producto(pestana, producto, resultado, instante)
+    registrar_producto_schema(metricas_schema(metricas, pestana['plan']['tipo']), resultado, inicio, instante)
+
+# Función para escribir en la pestaña el resultado ya generado de un producto
+# Con escritura encola la actualización del nombre en MongoDB; con cache también registra
+# el producto y su updatedAt para el modo incremental. En modo incremental la fila se
+# guarda en pestana['diferidos'] para mezclarla con las del cache (ver completar_desde_cache).
+# Con métricas e instante suma el tiempo de las etapas de escritura y devuelve el instante final
+def escribir_resultado_producto(pestana, producto, resultado, instante=None):
+    metricas = pestana.get('metricas') if instante is not None else None
+    if pestana.get('diferidos') is not None:
+        pestana['diferidos'].append((clave_orden_producto(producto.get('_id')), producto.get('sku', ''), resultado))
+    else:
+        agregar_resultado(pestana, producto.get('sku', ''), resultado)
+    if metricas is not None:
+        instante = marcar_etapa(metricas, 'escritura', instante)
+    
+    if pestana.get('escritura') is not None:
+        registrar_escritura_mongo(pestana['escritura'], producto, resultado, pestana.get('posicion_escritura'))
+        if metricas is not None:
+            instante = marcar_etapa(metricas, 'escritura_mongo', instante)
+    
+    cache = pestana.get('cache')
+    if cache is not None:
+        producto_id = str(producto.get('_id'))
+        pestana['vistos'].add(producto_id)
+        pestana['vistos_grupo'].add(producto_id)
+        actualizado = producto.get('updatedAt')
+        if isinstance(actualizado, datetime) and (pestana['marca_agua'] is None or actualizado > pestana['marca_agua']):
+            pestana['marca_agua'] = actualizado
+    return instante
+
+# Función para repartir los productos de una colección entre las pestañas de sus schemas
+# Cada producto se escribe una vez en cada pestaña cuyo tipo aparece en sus categorias.clave
+# Con métricas, el tiempo de leer el cursor se suma a la etapa 'consulta'
+def repartir_productos(productos, pestanas_por_tipo, metricas=None, columnas=False):
+    lotes = iterar_lotes(productos, BATCH_SIZE)
+    if metricas is not None:
+        lotes = medir_iterador(lotes, metricas, 'consulta')
+    
+    for lote in lotes:
+        if metricas is not None:
+            registrar_progreso(metricas, len(lote))
+        if columnas:
+            escribir_filas(nombrar_lote(lote, pestanas_por_tipo, metricas), metricas)
+            continue
+        for producto in lote:
+            for pestana in pestanas_del_producto(producto, pestanas_por_tipo):
+                try:
+                    escribir_producto(pestana, producto)
+                except Exception as e:
+                    # Un error en un schema no detiene a los demás de la colección
+                    pestana['error'] = e
+
+# Función para generar con el motor por columnas los nombres de un lote de productos de
+# una colección: cada pestaña genera juntos todos sus productos del lote. Devuelve las
+# filas (pestana, producto, resultado, error) en el orden de los productos
+def nombrar_lote(lote, pestanas_por_tipo, metricas=None):
+    pestanas_lote = []
+    productos_por_pestana = {}
+    for producto in lote:
+        pestanas = list(pestanas_del_producto(producto, pestanas_por_tipo))
+        pestanas_lote.append(pestanas)
+        for pestana in pestanas:
+            productos_por_pestana.setdefault(id(pestana), (pestana, []))[1].append(producto)
+    
+    resultados_por_pestana = {}
+    for clave, (pestana, productos) in productos_por_pestana.items():
+        inicio = instante_actual() if metricas is not None else None
+        try:
+            resultados = generar_nombres_lote(productos, pestana['plan'])
+        except Exception as e:
+            resultados_por_pestana[clave] = e
+            continue
+        if metricas is not None:
+            fin = marcar_etapa(metricas, 'nombres', inicio)
+            registrar_lote_schema(metricas_schema(metricas, pestana['plan']['tipo']), resultados, inicio, fin)
+        resultados_por_pestana[clave] = iter(resultados)
+    
+    filas = []
+    for producto, pestanas in zip(lote, pestanas_lote):
+        for pestana in pestanas:
+            resultados = resultados_por_pestana[id(pestana)]
+            if isinstance(resultados, Exception):
+                filas.append((pestana, producto, None, resultados))
+            else:
+                filas.append((pestana, producto, next(resultados), None))
+    return filas
+
+# Función para escribir filas (pestana, producto, resultado, error) ya generadas
+# Un error marca la pestaña y sus filas siguientes se descartan
+def escribir_filas(filas, metricas=None):
+    for pestana, producto, resultado, error in filas:
+        if pestana['error'] is not None:
+            continue
+        if error is not None:
+            pestana['error'] = error
+            continue
+        try:
+            escribir_resultado_producto(pestana, producto, resultado,
+                                        instante_actual() if metricas is not None else None)
+        except Exception as e:
+            pestana['error'] = e
+
+# Función para obtener las pestañas (sin error) donde va un producto: las de cada tipo
+# de sus categorias.clave, una sola vez por tipo
+def pestanas_del_producto(producto, pestanas_por_tipo):
+    tipos_vistos = set()
+    for categoria in producto.get('categorias') or []:
+        tipo = categoria.get('clave') if isinstance(categoria, dict) else None
+        if tipo in tipos_vistos or tipo not in pestanas_por_tipo:
+            continue
+        tipos_vistos.add(tipo)
+        
+        for pestana in pestanas_por_tipo[tipo]:
+            if pestana['error'] is None:
+                yield pestana
+
+# Marca de fin que cada hilo pone en su cola de salida al terminar
+FIN_COLA = object()
+
+# Función para poner un elemento en una cola acotada esperando lugar
+# Devuelve False si se canceló el procesamiento mientras esperaba
+def poner_en_cola(cola, elemento, cancelado):
+    while not cancelado.is_set():
+        try:
+            cola.put(elemento, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+# Función para sacar un elemento de una cola esperando que haya uno
+# Devuelve FIN_COLA si se canceló el procesamiento mientras esperaba
+def sacar_de_cola(cola, cancelado):
+    while not cancelado.is_set():
+        try:
+            return cola.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return FIN_COLA
+
+# Función para repartir los productos con hilos que se superponen: un hilo lee los lotes
+# del cursor, hilos_nombres hilos generan los nombres y el hilo actual escribe las filas
+# en el orden original. Las colas son acotadas (TAMANO_COLA_LOTES), así la lectura se
+# frena si la escritura se atrasa. Mientras un hilo espera a MongoDB los otros siguen
+# generando o escribiendo.
+# Igual que repartir_productos, un error en un schema se guarda en su pestaña; un error
+# al leer el cursor (o cualquier otro error inesperado) cancela todos los hilos y se relanza
+def repartir_productos_hilos(productos, pestanas_por_tipo, hilos_nombres, metricas=None, columnas=False):
+    lotes = queue.Queue(maxsize=TAMANO_COLA_LOTES)
+    resultados = queue.Queue(maxsize=TAMANO_COLA_LOTES)
+    cancelado = threading.Event()
+    errores = []
+    metricas_hilos = []
+    
+    def leer_lotes():
+        metricas_hilo = crear_metricas() if metricas is not None else None
+        metricas_hilos.append(metricas_hilo)
+        try:
+            iterador = iterar_lotes(productos, BATCH_SIZE)
+            if metricas_hilo is not None:
+                iterador = medir_iterador(iterador, metricas_hilo, 'consulta')
+            for numero, lote in enumerate(iterador):
+                if not poner_en_cola(lotes, (numero, lote), cancelado):
+                    return
+        except Exception as e:
+            errores.append(e)
+            cancelado.set()
+        finally:
+            if cancelado.is_set() and hasattr(productos, 'close'):
+                productos.close()
+            for _ in range(hilos_nombres):
+                poner_en_cola(lotes, FIN_COLA, cancelado)
+    
+    def generar_lotes():
+        metricas_hilo = crear_metricas() if metricas is not None else None
+        metricas_hilos.append(metricas_hilo)
+        try:
+            while True:
+                elemento = sacar_de_cola(lotes, cancelado)
+                if elemento is FIN_COLA:
+                    return
+                numero, lote = elemento
+                if columnas:
+                    filas = nombrar_lote(lote, pestanas_por_tipo, metricas_hilo)
+                    if not poner_en_cola(resultados, (numero, len(lote), filas), cancelado):
+                        return
+                    continue
+                filas = []
+                for producto in lote:
+                    for pestana in pestanas_del_producto(producto, pestanas_por_tipo):
+                        inicio = instante_actual() if metricas_hilo is not None else None
+                        try:
+                            resultado = generar_resultado(producto, pestana['plan'])
+                        except Exception as e:
+                            filas.append((pestana, producto, None, e))
+                            continue
+                        if metricas_hilo is not None:
+                            fin = marcar_etapa(metricas_hilo, 'nombres', inicio)
+                            registrar_producto_schema(metricas_schema(metricas_hilo, pestana['plan']['tipo']),
+                                                      resultado, inicio, fin)
+                        filas.append((pestana, producto, resultado, None))
+                if not poner_en_cola(resultados, (numero, len(lote), filas), cancelado):
+                    return
+        except Exception as e:
+            errores.append(e)
+            cancelado.set()
+        finally:
+            poner_en_cola(resultados, FIN_COLA, cancelado)
+    
+    hilos = [threading.Thread(target=leer_lotes, name='lectura', daemon=True)]
+    hilos.extend(threading.Thread(target=generar_lotes, name=f'nombres-{i + 1}', daemon=True)
+                 for i in range(hilos_nombres))
+    for hilo in hilos:
+        hilo.start()
+    
+    # Escribir los lotes en orden (los que llegan adelantados esperan en pendientes)
+    pendientes = {}
+    siguiente = 0
+    terminados = 0
+    try:
+        while terminados < hilos_nombres:
+            elemento = sacar_de_cola(resultados, cancelado)
+            if elemento is FIN_COLA:
+                if cancelado.is_set():
+                    break
+                terminados += 1
+                continue
+            numero, cantidad, filas = elemento
+            pendientes[numero] = (cantidad, filas)
+            while siguiente in pendientes:
+                cantidad, filas = pendientes.pop(siguiente)
+                siguiente += 1
+                if metricas is not None:
+                    registrar_progreso(metricas, cantidad)
+                escribir_filas(filas, metricas)
+    except BaseException:
+        cancelado.set()
+        raise
+    finally:
+        if errores:
+            cancelado.set()
+        for hilo in hilos:
+            hilo.join()
+        for metricas_hilo in metricas_hilos:
+            if metricas_hilo is not None:
+                combinar_metricas(metricas, metricas_hilo)
+    
+    if errores:
+        raise errores[0]
+
+# Función para completar una pestaña con los resultados del cache de los productos
+# que no se volvieron a consultar (modo incremental). Las filas de los productos
+# consultados (pestana['diferidos']) y las del cache se mezclan en orden de _id, así la
+# salida tiene el mismo orden que una ejecución completa. Se omiten los guardados de
+# todos los productos consultados en la colección, aunque ya no sean de este tipo
+def completar_desde_cache(pestana):
+    guardados = ((orden, sku, resultado)
+                 for producto_id, orden, sku, resultado in leer_resultados_cache(pestana['cache'], pestana['plan'])
+                 if producto_id not in pestana['vistos_grupo'])
+    diferidos = pestana.pop('diferidos')
+    for _, sku, resultado in heapq.merge(diferidos, guardados, key=lambda fila: fila[0]):
+        agregar_resultado(pestana, sku, resultado)
+
+# Función para borrar del cache los resultados que ya no corresponden a cada pestaña
+# del grupo: los de productos consultados cuyas categorias.clave ya no incluyen el tipo
+# y, en una ejecución completa, los de productos que la consulta ya no devuelve
+def limpiar_cache_grupo(datos_grupo, completa):
+    for schema_data in datos_grupo:
+        pestana = schema_data['pestana']
+        if pestana['error'] is not None:
+            continue
+        candidatos = leer_productos_cache(pestana['cache'], pestana['plan']) if completa else pestana['vistos_grupo']
+        eliminar_resultados_cache(pestana['cache'], pestana['plan'],
+                                  [producto_id for producto_id in candidatos if producto_id not in pestana['vistos']])
+
+# Función para generar la salida (Excel con múltiples pestañas o un archivo por schema)
+# Se hace una sola consulta por colección y cada producto se reparte a las pestañas
+# de los schemas que le corresponden; la cantidad procesada queda en
+# schema_data['total_productos'].
+# Con cache se reutilizan los nombres de productos sin cambios y los productos se
+# consultan en orden de _id; con incremental además solo se consultan los productos
+# modificados (updatedAt, o sin updatedAt) y el resto sale del cache en el mismo orden.
+# Con campo_escritura los nombres generados también se guardan en cada producto
+# Con metricas (ver crear_metricas) se registran tiempos por etapa y por schema.
+# Con hilos > 0 la lectura, los nombres y la escritura se superponen en hilos
+# (ver repartir_productos_hilos); no se puede usar con cache
+# Con columnas los nombres se generan por lotes con generar_nombres_lote; no se puede
+# usar con cache
+def generar_salida_multi_schema(db, datos_schemas, nombre_archivo, formato='xlsx', cache=None, incremental=False,
+                                campo_escritura=None, tamano_lote_escritura=TAMANO_LOTE_ESCRITURA,
+                                metricas=None, hilos=0, columnas=False, fragmentos=None):
+    # Abrir la salida: las filas se escriben a disco a medida que se agregan
+    formato_salida = formato_con_fragmentos(formato, fragmentos)
+    salida = formato_salida['abrir'](nombre_archivo)
+    
+    # Crear las pestañas en el orden de los schemas (las vacías se eliminan al final)
+    for schema_data in datos_schemas:
+        pestana = formato_salida['crear_pestana'](salida, schema_data['plan'], schema_data['nombre_pestana'])
+        pestana['error'] = None
+        pestana['metricas'] = metricas
+        if cache is not None:
+            pestana['cache'] = cache
+            pestana['vistos'] = set()
+            pestana['marca_agua'] = leer_marca_agua(cache, schema_data['plan'])
+        schema_data['pestana'] = pestana
+    
+    # Una consulta por colección
+    for coleccion_nombre, datos_grupo in agrupar_por_coleccion(datos_schemas).items():
+        print(f'\nConsultando colección: {coleccion_nombre} ({len(datos_grupo)} schemas)')
+        pestanas_por_tipo = {}
+        for schema_data in datos_grupo:
+            pestanas_por_tipo.setdefault(schema_data['tipo'], []).append(schema_data['pestana'])
+        
+        # Las pestañas de una colección comparten los lotes de escritura a MongoDB
+        escritura = None
+        if campo_escritura:
+            escritura = abrir_escritura_mongo(db[coleccion_nombre], campo_escritura, tamano_lote_escritura,
+                                              [schema_data['tipo'] for schema_data in datos_grupo])
+        for posicion, schema_data in enumerate(datos_grupo):
+            schema_data['pestana']['escritura'] = escritura
+            schema_data['pestana']['posicion_escritura'] = posicion
+        
+        # Los _id consultados de la colección se comparten entre las pestañas del grupo
+        if cache is not None:
+            vistos_grupo = set()
+            for schema_data in datos_grupo:
+                schema_data['pestana']['vistos_grupo'] = vistos_grupo
+        
+        # En modo incremental se consulta desde la marca de agua más antigua del grupo
+        desde = None
+        if incremental:
+            marcas = [schema_data['pestana']['marca_agua'] for schema_data in datos_grupo]
+            if all(marca is not None for marca in marcas):
+                desde = min(marcas)
+                print(f'   Modo incremental: productos modificados después de {desde}')
+                for schema_data in datos_grupo:
+                    schema_data['pestana']['diferidos'] = []
+        
+        try:
+            productos = consultar_coleccion(db[coleccion_nombre], datos_grupo, desde, cache is not None,
+                                            campo_escritura, ordenar_por_id=cache is not None)
+            if hilos > 0:
+                repartir_productos_hilos(productos, pestanas_por_tipo, hilos, metricas, columnas)
+            else:
+                repartir_productos(productos, pestanas_por_tipo, metricas, columnas)
+            if escritura is not None:
+                with medir_etapa(metricas, 'escritura_mongo'):
+                    volcar_escritura_mongo(escritura)
+                print(f'   Guardado en MongoDB ({campo_escritura}): {escritura["actualizados"]} actualizados, '
+                      f'{escritura["sin_cambios"]} sin cambios')
+            if cache is not None:
+                with medir_etapa(metricas, 'completar_cache'):
+                    guardar_cache(cache)
+                    limpiar_cache_grupo(datos_grupo, desde is None)
+                    if desde is not None:
+                        for schema_data in datos_grupo:
+                            if schema_data['pestana']['error'] is None:
+                                completar_desde_cache(schema_data['pestana'])
+        except Exception as e:
+            for schema_data in datos_grupo:
+                schema_data['pestana']['error'] = e
+    
+    # Terminar las pestañas con productos y eliminar las vacías o con error
+    pestanas_creadas = 0
+    for schema_data in datos_schemas:
+        pestana = schema_data['pestana']
+        schema_data['total_productos'] = 0
+        
+        if pestana['error'] is not None:
+            print(f'Error al procesar {schema_data["tipo"]}: {pestana["error"]}')
+            formato_salida['eliminar_pestana'](salida, pestana)
+            continue
+        
+        with medir_etapa(metricas, 'guardado'):
+            if pestana['total'] == 0:  # Solo conservar la pestaña si hay productos
+                formato_salida['eliminar_pestana'](salida, pestana)
+            else:
+                schema_data['total_productos'] = formato_salida['cerrar_pestana'](pestana)
+                pestanas_creadas += 1
+        print(f'{schema_data["tipo"]}: {schema_data["total_productos"]} productos')
+        
+        if cache is not None and pestana['marca_agua'] is not None:
+            guardar_marca_agua(cache, schema_data['plan'], pestana['marca_agua'])
+    
+    with medir_etapa(metricas, 'guardado'):
+        formato_salida['guardar'](salida)
+    return pestanas_creadas
+
+# Función para leer los productos de un archivo JSON (un producto o una lista de
+# productos) o JSON Lines (.jsonl, un producto por línea, se lee en streaming)
+def leer_productos_json(ruta):
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        if ruta.endswith('.jsonl'):
+            for linea in archivo:
+                if linea.strip():
+                    yield json.loads(linea)
+            return
+        datos = json.load(archivo)
+    yield from (datos if isinstance(datos, list) else [datos])
+
+# Función para generar la salida de productos que no vienen de MongoDB (ej: leídos con
+# leer_productos_json). Cada producto va a las pestañas de los tipos de sus
+# categorias.clave, igual que en generar_salida_multi_schema
+def generar_salida_productos(productos, datos_schemas, nombre_archivo, formato='jsonl', metricas=None,
+                             columnas=False, fragmentos=None):
+    formato_salida = formato_con_fragmentos(formato, fragmentos)
+    salida = formato_salida['abrir'](nombre_archivo)
+    
+    pestanas_por_tipo = {}
+    for schema_data in datos_schemas:
+        pestana = formato_salida['crear_pestana'](salida, schema_data['plan'], schema_data['nombre_pestana'])
+        pestana['error'] = None
+        pestana['metricas'] = metricas
+        schema_data['pestana'] = pestana
+        pestanas_por_tipo.setdefault(schema_data['tipo'], []).append(pestana)
+    
+    try:
+        repartir_productos(productos, pestanas_por_tipo, metricas, columnas)
+    except Exception:
+        # Error al leer los productos: ninguna pestaña queda completa
+        for schema_data in datos_schemas:
+            formato_salida['eliminar_pestana'](salida, schema_data['pestana'])
+        raise
+    
+    # Terminar las pestañas con productos y eliminar las vacías o con error
+    pestanas_creadas = 0
+    for schema_data in datos_schemas:
+        pestana = schema_data['pestana']
+        schema_data['total_productos'] = 0
+        if pestana['error'] is not None:
+            print(f'Error al procesar {schema_data["tipo"]}: {pestana["error"]}')
+            formato_salida['eliminar_pestana'](salida, pestana)
+        elif pestana['total'] == 0:
+            formato_salida['eliminar_pestana'](salida, pestana)
+        else:
+            schema_data['total_productos'] = formato_salida['cerrar_pestana'](pestana)
+            pestanas_creadas += 1
+            print(f'{schema_data["tipo"]}: {schema_data["total_productos"]} productos')
+    
+    formato_salida['guardar'](salida)
+    return pestanas_creadas
+
+# Función para generar la salida con el motor pipeline: cada schema se consulta con un
+# aggregate que devuelve el nombre ya armado (ver crear_pipeline), así MongoDB solo envía
+# el SKU, el nombre y el valor de cada campo
+def generar_salida_pipeline(db, datos_schemas, nombre_archivo, formato='xlsx', campo_escritura=None,
+                            tamano_lote_escritura=TAMANO_LOTE_ESCRITURA, metricas=None, fragmentos=None):
+    formato_salida = formato_con_fragmentos(formato, fragmentos)
+    salida = formato_salida['abrir'](nombre_archivo)
+    # Con escritura también se piden las categorías: cada producto guarda solo el nombre del
+    # primer schema de su colección que le corresponde (ver registrar_escritura_mongo)
+    campos_extra = (campo_escritura, f'{campo_escritura}Faltantes', 'categorias.clave') if campo_escritura else ()
+    grupos = agrupar_por_coleccion(datos_schemas)
+    pestanas_creadas = 0
+    
+    for schema_data in datos_schemas:
+        print(f'\nProcesando: {schema_data["tipo"]}')
+        plan = schema_data['plan']
+        schema_data['total_productos'] = 0
+        pestana = formato_salida['crear_pestana'](salida, plan, schema_data['nombre_pestana'])
+        escritura = None
+        if campo_escritura:
+            datos_grupo = grupos[schema_data['coleccion']]
+            escritura = abrir_escritura_mongo(db[schema_data['coleccion']], campo_escritura, tamano_lote_escritura,
+                                              [datos['tipo'] for datos in datos_grupo])
+            posicion = next(i for i, datos in enumerate(datos_grupo) if datos is schema_data)
+        
+        try:
+            pipeline = crear_pipeline(schema_data['estructura'], {'categorias.clave': schema_data['tipo']}, campos_extra)
+            documentos = db[schema_data['coleccion']].aggregate(pipeline, batchSize=BATCH_SIZE)
+            lotes = iterar_lotes(documentos, BATCH_SIZE)
+            if metricas is not None:
+                lotes = medir_iterador(lotes, metricas, 'consulta')
+            
+            for lote in lotes:
+                if metricas is not None:
+                    registrar_progreso(metricas, len(lote))
+                for documento in lote:
+                    if metricas is not None:
+                        inicio = instante = instante_actual()
+                    resultado = resultado_desde_pipeline(documento, plan)
+                    if metricas is not None:
+                        instante = marcar_etapa(metricas, 'nombres', instante)
+                    agregar_resultado(pestana, documento.get('sku', ''), resultado)
+                    if escritura is not None:
+                        registrar_escritura_mongo(escritura, documento, resultado, posicion)
+                    if metricas is not None:
+                        instante = marcar_etapa(metricas, 'escritura', instante)
+                        registrar_producto_schema(metricas_schema(metricas, plan['tipo']), resultado, inicio, instante)
+            if escritura is not None:
+                with medir_etapa(metricas, 'escritura_mongo'):
+                    volcar_escritura_mongo(escritura)
+        except Exception as e:
+            print(f'Error al procesar {schema_data["tipo"]}: {e}')
+            formato_salida['eliminar_pestana'](salida, pestana)
+            continue
+        
+        with medir_etapa(metricas, 'guardado'):
+            if pestana['total'] == 0:  # Solo conservar la pestaña si hay productos
+                formato_salida['eliminar_pestana'](salida, pestana)
+            else:
+                schema_data['total_productos'] = formato_salida['cerrar_pestana'](pestana)
+                pestanas_creadas += 1
+        print(f'Productos encontrados: {schema_data["total_productos"]}')
+    
+    with medir_etapa(metricas, 'guardado'):
+        formato_salida['guardar'](salida)
+    return pestanas_creadas
+
+# Función para verificar que el motor pipeline genera los mismos resultados que
+# generar_nombre_producto: por cada lote de productos de un schema se ejecuta el
+# pipeline sobre los mismos _id y se comparan los resultados. Devuelve la cantidad
+# de diferencias e imprime hasta max_ejemplos ejemplos por schema
+def verificar_paridad_pipeline(db, datos_schemas, max_ejemplos=5):
+    diferencias_totales = 0
+    for schema_data in datos_schemas:
+        plan = schema_data['plan']
+        collection = db[schema_data['coleccion']]
+        query = {'categorias.clave': schema_data['tipo']}
+        comparados = 0
+        diferencias = 0
+        
+        productos = collection.find(query, plan['proyeccion'], batch_size=BATCH_SIZE)
+        for lote in iterar_lotes(productos, BATCH_SIZE):
+            ids = [producto['_id'] for producto in lote]
+            pipeline = crear_pipeline(schema_data['estructura'], dict(query, _id={'$in': ids}))
+            documentos = {documento['_id']: documento for documento in collection.aggregate(pipeline)}
+            
+            for producto in lote:
+                comparados += 1
+                try:
+                    esperado = generar_nombre_producto(producto, plan)
+                except Exception as e:
+                    esperado = f'Error: {e}'
+                documento = documentos.get(producto['_id'])
+                try:
+                    obtenido = resultado_desde_pipeline(documento, plan) if documento else 'Sin documento'
+                except Exception as e:
+                    obtenido = f'Error: {e}'
+                
+                if esperado != obtenido:
+                    diferencias += 1
+                    if diferencias <= max_ejemplos:
+                        print(f'   Diferencia en {producto.get("sku", producto["_id"])}:')
+                        print(f'      python:   {esperado}')
+                        print(f'      pipeline: {obtenido}')
+        
+        print(f'{schema_data["tipo"]}: {comparados} productos comparados, {diferencias} diferencias')
+        diferencias_totales += diferencias
+    return diferencias_totales
@@ -0,0 +1,181 @@
+# Métricas de tiempo por etapa y por schema (--metricas)
+import json
+import time
+from contextlib import contextmanager
+from .config import INTERVALO_PROGRESO
+from .motor import estadisticas_cache_transformaciones
+
+# Función para crear el registro de métricas de una ejecución
+# etapas: tiempo de reloj y CPU acumulado por etapa (consulta, nombres, escritura, ...)
+# schemas: productos, tiempo y cantidad de faltantes por campo de cada schema
+# caches: aciertos y fallos de los caches en otros procesos (--workers), por cache
+def crear_metricas():
+    return {
+        'inicio': instante_actual(),
+        'cpu_proceso': time.process_time(),
+        'etapas': {},
+        'schemas': {},
+        'caches': {},
+        'productos': 0,
+        'ultimo_progreso': time.perf_counter()
+    }
+
+# Función para obtener el instante actual: (tiempo de reloj, tiempo de CPU del hilo)
+# Se usa el CPU del hilo para que las etapas que corren en otros hilos (--hilos) no se mezclen
+def instante_actual():
+    return time.perf_counter(), time.thread_time()
+
+# Función para sumar a una etapa el tiempo transcurrido desde un instante
+# Devuelve el instante actual, para encadenar etapas sin volver a medir
+def marcar_etapa(metricas, etapa, desde):
+    ahora = instante_actual()
+    datos = metricas['etapas'].setdefault(etapa, {'segundos': 0.0, 'cpu': 0.0})
+    datos['segundos'] += ahora[0] - desde[0]
+    datos['cpu'] += ahora[1] - desde[1]
+    return ahora
+
+# Función para medir una etapa que no se puede marcar producto a producto
+# (ej: guardar el archivo); sin métricas no mide nada
+@contextmanager
+def medir_etapa(metricas, etapa):
+    if metricas is None:
+        yield
+        return
+    inicio = instante_actual()
+    try:
+        yield
+    finally:
+        marcar_etapa(metricas, etapa, inicio)
+
+# Función para recorrer un iterable sumando a una etapa el tiempo de obtener cada
+# elemento (ej: el tiempo de espera del cursor de MongoDB)
+def medir_iterador(iterable, metricas, etapa):
+    iterador = iter(iterable)
+    while True:
+        inicio = instante_actual()
+        try:
+            elemento = next(iterador)
+        except StopIteration:
+            marcar_etapa(metricas, etapa, inicio)
+            return
+        marcar_etapa(metricas, etapa, inicio)
+        yield elemento
+
+# Función para obtener las métricas de un schema
+def metricas_schema(metricas, tipo):
+    return metricas['schemas'].setdefault(tipo, {
+        'productos': 0,
+        'segundos': 0.0,
+        'cpu': 0.0,
+        'faltantes': {}
+    })
+
+# Función para registrar en las métricas de un schema un producto procesado entre dos instantes
+def registrar_producto_schema(datos_schema, resultado, inicio, fin):
+    registrar_lote_schema(datos_schema, [resultado], inicio, fin)
+
+# Función para registrar en las métricas de un schema un lote de productos procesado
+# entre dos instantes (ver generar_nombres_lote)
+def registrar_lote_schema(datos_schema, resultados, inicio, fin):
+    datos_schema['productos'] += len(resultados)
+    datos_schema['segundos'] += fin[0] - inicio[0]
+    datos_schema['cpu'] += fin[1] - inicio[1]
+    faltantes = datos_schema['faltantes']
+    for resultado in resultados:
+        for nombre in resultado.campos_faltantes():
+            faltantes[nombre] = faltantes.get(nombre, 0) + 1
+
+# Función para sumar las métricas de un worker o de un hilo a las de la ejecución
+def combinar_metricas(metricas, metricas_otro):
+    for etapa, datos in metricas_otro['etapas'].items():
+        acumulado = metricas['etapas'].setdefault(etapa, {'segundos': 0.0, 'cpu': 0.0})
+        acumulado['segundos'] += datos['segundos']
+        acumulado['cpu'] += datos['cpu']
+    
+    for tipo, datos_otro in metricas_otro['schemas'].items():
+        datos_schema = metricas_schema(metricas, tipo)
+        for clave in ('productos', 'segundos', 'cpu'):
+            datos_schema[clave] += datos_otro[clave]
+        for nombre, cantidad in datos_otro['faltantes'].items():
+            datos_schema['faltantes'][nombre] = datos_schema['faltantes'].get(nombre, 0) + cantidad
+    
+    for nombre, info in metricas_otro.get('caches', {}).items():
+        acumulado = metricas['caches'].setdefault(nombre, {'aciertos': 0, 'fallos': 0})
+        acumulado['aciertos'] += info['aciertos']
+        acumulado['fallos'] += info['fallos']
+
+# Función para obtener los aciertos y fallos de los caches de este proceso desde una
+# lectura anterior de estadisticas_cache_transformaciones (un worker atiende varias tareas)
+def diferencia_caches(antes):
+    return {
+        nombre: {'aciertos': info['aciertos'] - antes[nombre]['aciertos'],
+                 'fallos': info['fallos'] - antes[nombre]['fallos']}
+        for nombre, info in estadisticas_cache_transformaciones().items()
+    }
+
+# Función para obtener los aciertos y fallos de todos los caches de la ejecución: los de
+# este proceso, los de los workers y (si se indica) los del cache SQLite de nombres
+def estadisticas_caches(metricas, cache=None):
+    caches = {nombre: {'aciertos': info['aciertos'], 'fallos': info['fallos']}
+              for nombre, info in estadisticas_cache_transformaciones().items()}
+    if cache is not None:
+        caches['nombres'] = {'aciertos': cache['aciertos'], 'fallos': cache['fallos']}
+    for nombre, info in metricas['caches'].items():
+        acumulado = caches.setdefault(nombre, {'aciertos': 0, 'fallos': 0})
+        acumulado['aciertos'] += info['aciertos']
+        acumulado['fallos'] += info['fallos']
+    return caches
+
+# Función para sumar productos procesados e imprimir una línea de progreso cada
+# INTERVALO_PROGRESO segundos
+def registrar_progreso(metricas, cantidad):
+    metricas['productos'] += cantidad
+    ahora = time.perf_counter()
+    if ahora - metricas['ultimo_progreso'] >= INTERVALO_PROGRESO:
+        metricas['ultimo_progreso'] = ahora
+        transcurrido = ahora - metricas['inicio'][0]
+        print(f'   Progreso: {metricas["productos"]} productos '
+              f'({metricas["productos"] / transcurrido:.0f} productos/s)')
+
+# Función para armar el resumen de las métricas (lo que se guarda en el JSON)
+# En modo --workers las etapas de los workers suman el tiempo de todos los procesos
+def resumir_metricas(metricas, cache=None):
+    fin = instante_actual()
+    segundos = fin[0] - metricas['inicio'][0]
+    productos = sum(datos['productos'] for datos in metricas['schemas'].values())
+    
+    resumen = {
+        'segundos': round(segundos, 3),
+        'cpu': round(time.process_time() - metricas['cpu_proceso'], 3),
+        'productos': productos,
+        'productos_por_segundo': round(productos / segundos, 1) if segundos else None,
+        'etapas': {
+            etapa: {'segundos': round(datos['segundos'], 3), 'cpu': round(datos['cpu'], 3)}
+            for etapa, datos in metricas['etapas'].items()
+        },
+        'schemas': {
+            tipo: {
+                'productos': datos['productos'],
+                'segundos': round(datos['segundos'], 3),
+                'cpu': round(datos['cpu'], 3),
+                'productos_por_segundo': round(datos['productos'] / datos['segundos'], 1) if datos['segundos'] else None,
+                'faltantes': datos['faltantes']
+            }
+            for tipo, datos in metricas['schemas'].items()
+        },
+        'caches': {}
+    }
+    
+    for nombre, info in estadisticas_caches(metricas, cache).items():
+        consultas = info['aciertos'] + info['fallos']
+        resumen['caches'][nombre] = {
+            'aciertos': info['aciertos'],
+            'fallos': info['fallos'],
+            'tasa_aciertos': round(info['aciertos'] / consultas, 4) if consultas else None
+        }
+    return resumen
+
+# Función para guardar el resumen de las métricas en un archivo JSON
+def guardar_metricas(resumen, ruta):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(resumen, archivo, ensure_ascii=False, indent=2)
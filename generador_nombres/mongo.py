@@ -0,0 +1,204 @@
+# Acceso a MongoDB: conexión, consultas por colección, escritura de los nombres
+# (--escribir-mongo) y revisión de índices (--check-indexes)
+from .config import MONGO_URI, BATCH_SIZE, TAMANO_LOTE_ESCRITURA, INDICE_RECOMENDADO
+from .motor import crear_proyeccion
+
+# Función para conectar a MongoDB (el cliente mantiene su pool de conexiones)
+# pymongo se importa recién aquí, así los comandos que no usan MongoDB no lo cargan
+def conectar(uri=MONGO_URI):
+    from pymongo import MongoClient
+    return MongoClient(uri)
+
+# Función para preparar la escritura de los nombres generados en una colección de MongoDB
+# El nombre se guarda en campo y la lista de campos faltantes en <campo>Faltantes
+# tipos son los de los schemas de la colección en el orden de los schemas: un producto que
+# pertenece a varios solo guarda el nombre del primero (ver schema_escritura)
+def abrir_escritura_mongo(collection, campo, tamano_lote=TAMANO_LOTE_ESCRITURA, tipos=()):
+    return {
+        'collection': collection,
+        'campo': campo,
+        'campo_faltantes': f'{campo}Faltantes',
+        'tamano_lote': tamano_lote,
+        'tipos': list(tipos),
+        'operaciones': [],
+        'actualizados': 0,
+        'sin_cambios': 0
+    }
+
+# Función para agregar a la proyección los campos donde se guarda el nombre
+# (se leen para no reescribir los productos que ya tienen el mismo valor)
+def proyeccion_con_escritura(proyeccion, campo):
+    proyeccion = dict(proyeccion)
+    proyeccion[campo] = 1
+    proyeccion[f'{campo}Faltantes'] = 1
+    return proyeccion
+
+# Función para obtener la posición (entre los tipos de la escritura) del schema que guarda
+# el nombre de un producto: el primero cuyo tipo está en sus categorias.clave
+def schema_escritura(escritura, producto):
+    claves = {categoria.get('clave') for categoria in producto.get('categorias') or [] if isinstance(categoria, dict)}
+    return next((posicion for posicion, tipo in enumerate(escritura['tipos']) if tipo in claves), None)
+
+# Función para encolar la actualización del nombre de un producto
+# Con posicion (la del schema entre los tipos de la escritura) solo se guarda el nombre del
+# schema que le corresponde al producto, así cada producto se escribe una vez por ejecución.
+# Los productos cuyo valor guardado ya es igual al generado se omiten
+def registrar_escritura_mongo(escritura, producto, resultado, posicion=None):
+    producto_id = producto.get('_id')
+    if producto_id is None:
+        return
+    if posicion is not None and len(escritura['tipos']) > 1 and schema_escritura(escritura, producto) != posicion:
+        return
+    
+    faltantes = resultado.campos_faltantes()
+    if (producto.get(escritura['campo']) == resultado.nombre_completo
+            and producto.get(escritura['campo_faltantes']) == faltantes):
+        escritura['sin_cambios'] += 1
+        return
+    
+    from pymongo import UpdateOne
+    escritura['operaciones'].append(UpdateOne({'_id': producto_id}, {'$set': {
+        escritura['campo']: resultado.nombre_completo,
+        escritura['campo_faltantes']: faltantes
+    }}))
+    if len(escritura['operaciones']) >= escritura['tamano_lote']:
+        volcar_escritura_mongo(escritura)
+
+# Función para enviar las actualizaciones pendientes en un solo bulk_write sin orden
+def volcar_escritura_mongo(escritura):
+    if escritura['operaciones']:
+        escritura['collection'].bulk_write(escritura['operaciones'], ordered=False)
+        escritura['actualizados'] += len(escritura['operaciones'])
+        escritura['operaciones'] = []
+
+# Función para agrupar los schemas por colección, conservando el orden original
+def agrupar_por_coleccion(datos_schemas):
+    grupos = {}
+    for schema_data in datos_schemas:
+        grupos.setdefault(schema_data['coleccion'], []).append(schema_data)
+    return grupos
+
+# Función para abrir un único cursor con los productos de todos los schemas de una colección
+# La proyección es la unión de los campos que leen las estructuras del grupo
+# Con desde (modo incremental) solo se piden los productos con updatedAt posterior o
+# sin updatedAt (no se puede saber si cambiaron)
+# Con campo_escritura también se piden los valores guardados del nombre; con skus solo
+# se piden esos productos. Con ordenar_por_id los productos vienen en orden de _id
+# (a partir de despues_de_id, si se indica)
+def consultar_coleccion(collection, datos_grupo, desde=None, con_fecha=False, campo_escritura=None, skus=None,
+                        despues_de_id=None, ordenar_por_id=False):
+    tipos = []
+    estructura_union = []
+    for schema_data in datos_grupo:
+        if schema_data['tipo'] not in tipos:
+            tipos.append(schema_data['tipo'])
+        estructura_union.extend(schema_data['estructura'])
+    
+    query = {'categorias.clave': {'$in': tipos}}
+    proyeccion = crear_proyeccion(estructura_union)
+    if desde is not None:
+        query['$or'] = [{'updatedAt': {'$gt': desde}}, {'updatedAt': {'$exists': False}}]
+    if skus is not None:
+        query['sku'] = {'$in': skus}
+    if despues_de_id is not None:
+        query['_id'] = {'$gt': despues_de_id}
+    if con_fecha or desde is not None:
+        proyeccion['updatedAt'] = 1
+    if campo_escritura:
+        proyeccion = proyeccion_con_escritura(proyeccion, campo_escritura)
+    if ordenar_por_id:
+        return collection.find(query, proyeccion, batch_size=BATCH_SIZE, sort=[('_id', 1)])
+    return collection.find(query, proyeccion, batch_size=BATCH_SIZE)
+
+# Función para obtener las etapas del plan ganador de un explain, incluidos los planes
+# de cada shard y los de SBE (que vienen dentro de queryPlan)
+def etapas_plan(plan):
+    etapas = []
+    pendientes = [plan]
+    while pendientes:
+        etapa = pendientes.pop()
+        for shard in etapa.get('shards', []):
+            pendientes.append(shard.get('winningPlan', {}))
+        if 'queryPlan' in etapa:
+            pendientes.append(etapa['queryPlan'])
+            continue
+        if 'stage' in etapa:
+            etapas.append(etapa)
+        if 'inputStage' in etapa:
+            pendientes.append(etapa['inputStage'])
+        pendientes.extend(etapa.get('inputStages', []))
+    return etapas
+
+# Función para analizar el plan de un cursor con explain(): recorrido (COLLSCAN o IXSCAN),
+# índices usados, si la consulta queda cubierta por el índice (sin FETCH), documentos
+# examinados y devueltos, y el tiempo de ejecución en el servidor
+def analizar_consulta(cursor):
+    explicacion = cursor.explain()
+    etapas = etapas_plan(explicacion.get('queryPlanner', {}).get('winningPlan', {}))
+    nombres = [etapa['stage'] for etapa in etapas]
+    estadisticas = explicacion.get('executionStats', {})
+    
+    if 'COLLSCAN' in nombres:
+        recorrido = 'COLLSCAN'
+    elif 'IXSCAN' in nombres:
+        recorrido = 'IXSCAN'
+    else:
+        recorrido = nombres[0] if nombres else 'DESCONOCIDO'
+    
+    return {
+        'recorrido': recorrido,
+        'indices': list(dict.fromkeys(etapa['indexName'] for etapa in etapas if etapa.get('indexName'))),
+        'cubierta': recorrido == 'IXSCAN' and 'FETCH' not in nombres,
+        'examinados': estadisticas.get('totalDocsExamined'),
+        'claves_examinadas': estadisticas.get('totalKeysExamined'),
+        'devueltos': estadisticas.get('nReturned'),
+        'milisegundos': estadisticas.get('executionTimeMillis')
+    }
+
+# Función para buscar un índice de la colección que empiece por categorias.clave
+# Devuelve el nombre del índice o None
+def indice_categorias(collection):
+    for nombre, info in collection.index_information().items():
+        if info['key'] and info['key'][0][0] == 'categorias.clave':
+            return nombre
+    return None
+
+# Función para imprimir el análisis de una consulta en una línea
+def imprimir_analisis(etiqueta, analisis):
+    indices = f' ({", ".join(analisis["indices"])})' if analisis['indices'] else ''
+    cubierta = ', cubierta por el índice' if analisis['cubierta'] else ''
+    print(f'  {etiqueta}: {analisis["recorrido"]}{indices}{cubierta} - '
+          f'{analisis["examinados"]} documentos examinados, {analisis["devueltos"]} devueltos, '
+          f'{analisis["milisegundos"]} ms en el servidor')
+
+# Función para revisar con explain() las consultas de cada colección: la consulta de
+# cada schema ({'categorias.clave': tipo} con su proyección) y la consulta agrupada que
+# usa la generación. Con crear, agrega INDICE_RECOMENDADO a las colecciones sin un
+# índice sobre categorias.clave antes de analizar. Devuelve la cantidad de consultas
+# que recorren toda la colección
+def revisar_indices(db, datos_schemas, crear=False):
+    recorridos_completos = 0
+    for coleccion_nombre, datos_grupo in agrupar_por_coleccion(datos_schemas).items():
+        collection = db[coleccion_nombre]
+        print(f'\nColección {coleccion_nombre}:')
+        
+        indice = indice_categorias(collection)
+        if indice is None and crear:
+            indice = collection.create_index(INDICE_RECOMENDADO)
+            print(f'  Índice creado: {indice}')
+        elif indice is None:
+            claves = ', '.join(f'{campo}: {orden}' for campo, orden in INDICE_RECOMENDADO)
+            print(f'  Sin índice sobre categorias.clave (recomendado: {{{claves}}}, usar --create-indexes)')
+        else:
+            print(f'  Índice sobre categorias.clave: {indice}')
+        
+        consultas = [(schema_data['tipo'], collection.find({'categorias.clave': schema_data['tipo']},
+                                                           schema_data['plan']['proyeccion']))
+                     for schema_data in datos_grupo]
+        consultas.append(('Consulta agrupada', consultar_coleccion(collection, datos_grupo)))
+        for etiqueta, cursor in consultas:
+            analisis = analizar_consulta(cursor)
+            imprimir_analisis(etiqueta, analisis)
+            if analisis['recorrido'] == 'COLLSCAN':
+                recorridos_completos += 1
+    return recorridos_completos
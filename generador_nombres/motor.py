@@ -0,0 +1,520 @@
+# Motor de nombres: transformaciones de texto, extracción de campos, plan compilado de
+# cada schema y generación del nombre de un producto (o de un lote, por columnas)
+import json
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from .config import TAMANO_CACHE_TRANSFORMACIONES, TAMANO_CACHE_PALABRAS, TAMANO_CACHE_RESULTADOS
+
+# Función para convertir plural a singular en español
+# Se memoriza por palabra: las mismas palabras se repiten en miles de productos
+@lru_cache(maxsize=TAMANO_CACHE_PALABRAS)
+def plural_a_singular(palabra):
+    # Convertir una palabra de plural a singular
+    palabra_lower = palabra.lower()
+    
+    # Reglas de pluralización en español (aplicadas en reversa)
+    # Palabras que terminan en -ces → -z (ej: luces → luz)
+    if palabra_lower.endswith('ces'):
+        base = palabra[:-3]
+        return base + 'z'
+    
+    # Palabras que terminan en -es después de consonante (ej: cables → cable)
+    elif palabra_lower.endswith('es') and len(palabra) > 2:
+        # Verificar si antes de 'es' hay una consonante
+        if palabra[-3] not in 'aeiouáéíóú':
+            return palabra[:-2]
+        # Si termina en -ies, cambiar a -y (aunque es menos común en español)
+        elif palabra_lower.endswith('ies'):
+            return palabra[:-3] + 'y'
+        # Para palabras que terminan en vocal + es, quitar solo la 's'
+        else:
+            return palabra[:-1]
+    
+    # Palabras que terminan en -s después de vocal (ej: laptops → laptop, autos → auto)
+    elif palabra_lower.endswith('s') and len(palabra) > 1:
+        # Verificar si antes de 's' hay una vocal
+        if palabra[-2] in 'aeiouáéíóú':
+            return palabra[:-1]
+        # Si termina en consonante + s, generalmente quitar solo la 's'
+        else:
+            return palabra[:-1]
+    
+    # Si no coincide con ninguna regla, devolver la palabra original
+    return palabra
+
+# Función para convertir texto de plural a singular
+def texto_a_singular(texto):
+    if not texto:
+        return texto
+    
+    # Dividir el texto en palabras
+    palabras = texto.split()
+    palabras_singulares = []
+    
+    for palabra in palabras:
+        # Preservar mayúsculas/minúsculas originales
+        if palabra.isupper():
+            # Si toda la palabra está en mayúsculas
+            palabras_singulares.append(plural_a_singular(palabra).upper())
+        elif palabra[0].isupper():
+            # Si solo la primera letra está en mayúscula
+            singular = plural_a_singular(palabra)
+            palabras_singulares.append(singular[0].upper() + singular[1:])
+        else:
+            # Minúsculas
+            palabras_singulares.append(plural_a_singular(palabra))
+    
+    return ' '.join(palabras_singulares)
+
+# Transformaciones de texto disponibles en los schemas ('ninguna' no transforma)
+TRANSFORMADORES = {
+    'mayuscula': lambda texto: texto.upper(),
+    'minuscula': lambda texto: texto.lower(),
+    'capitalize': lambda texto: texto.capitalize(),
+    'singular': texto_a_singular,
+}
+
+# Función para aplicar una transformación a un texto, memorizando el resultado
+# por (texto, transformación) con un LRU acotado
+@lru_cache(maxsize=TAMANO_CACHE_TRANSFORMACIONES)
+def transformar_texto_cacheado(texto, transformacion):
+    return TRANSFORMADORES[transformacion](texto)
+
+# Función para crear la función de transformación de un campo del schema
+# Devuelve None si el campo no se transforma ('ninguna' o sin transformación)
+def crear_transformador(transformacion):
+    transformador = TRANSFORMADORES.get(transformacion)
+    if transformador is None:
+        return None
+    
+    def transformar(texto):
+        # Solo los textos pasan por el cache (otros valores pueden no ser hashables)
+        if isinstance(texto, str):
+            return transformar_texto_cacheado(texto, transformacion)
+        return transformador(texto)
+    return transformar
+
+# Función para aplicar transformación de texto
+def aplicar_transformacion(texto, transformacion):
+    if not texto:
+        return None
+    
+    transformador = crear_transformador(transformacion)
+    if transformador is None:  # 'ninguna'
+        return texto
+    return transformador(texto)
+
+# Función para obtener los aciertos y fallos de los caches de transformaciones
+def estadisticas_cache_transformaciones():
+    estadisticas = {}
+    for nombre, funcion in (('transformaciones', transformar_texto_cacheado), ('palabras', plural_a_singular)):
+        info = funcion.cache_info()
+        estadisticas[nombre] = {
+            'aciertos': info.hits,
+            'fallos': info.misses,
+            'tamano': info.currsize,
+            'tamano_maximo': info.maxsize
+        }
+    with _bloqueo_resultados:
+        estadisticas['resultados'] = {
+            'aciertos': _estadisticas_resultados['aciertos'],
+            'fallos': _estadisticas_resultados['fallos'],
+            'tamano': len(_cache_resultados),
+            'tamano_maximo': TAMANO_CACHE_RESULTADOS
+        }
+    return estadisticas
+
+# Función para vaciar el cache de resultados por valores crudos y sus estadísticas
+def limpiar_cache_resultados():
+    with _bloqueo_resultados:
+        _cache_resultados.clear()
+        _estadisticas_resultados['aciertos'] = 0
+        _estadisticas_resultados['fallos'] = 0
+
+# Función para indexar las especificaciones de un producto por (tituloSeccion, dato)
+# Si un dato se repite se conserva la primera aparición, igual que el recorrido lineal
+def indexar_especificaciones(especificaciones):
+    indice = {}
+    for seccion in especificaciones:
+        titulo_seccion = seccion.get('tituloSeccion')
+        for item in seccion.get('seccionList', []):
+            clave = (titulo_seccion, item.get('dato'))
+            if clave not in indice:
+                indice[clave] = item.get('valor')
+    return indice
+
+# Función para buscar un valor en el índice de especificaciones
+def buscar_especificacion(indice, titulo_seccion, dato):
+    # Si dato es una lista, las alternativas se prueban en el orden del schema
+    if isinstance(dato, list):
+        for alternativa in dato:
+            clave = (titulo_seccion, alternativa)
+            if clave in indice:
+                return indice[clave]
+        return None
+    return indice.get((titulo_seccion, dato))
+
+# Función para extraer valor de especificaciones
+def extraer_especificacion(especificaciones, titulo_seccion, dato):
+    return buscar_especificacion(indexar_especificaciones(especificaciones), titulo_seccion, dato)
+
+# Función para obtener el nombre del campo para el encabezado
+def obtener_nombre_campo(campo_config):
+    if campo_config['campo'] == 'especificaciones' and 'condicion' in campo_config:
+        # Para especificaciones, usar el nombre del dato específico
+        try:
+            dato = campo_config['subcampo']['seccionList']['condicion']['dato']
+            # Si dato es una lista, usar el primero o concatenar
+            if isinstance(dato, list):
+                return dato[0] if dato else 'especificaciones'
+            return dato
+        except (KeyError, TypeError):
+            return 'especificaciones'
+    else:
+        # Para otros campos, usar el nombre del campo
+        return campo_config['campo']
+
+# Función para crear el extractor de un campo del schema
+# El extractor recibe el producto y un diccionario de contexto de la fila (donde se
+# guarda el índice de especificaciones la primera vez que se necesita) y devuelve
+# el valor crudo (sin transformar)
+def crear_extractor(campo_config):
+    campo = campo_config['campo']
+    
+    if campo == 'marca' or campo == 'nombreProducto':
+        return lambda producto, contexto: producto.get(campo)
+    
+    if campo == 'categorias':
+        index = campo_config.get('index', 0)
+        subcampo = campo_config.get('subcampo')
+        
+        def extraer_categoria(producto, contexto):
+            categorias = producto.get('categorias', [])
+            if categorias:
+                categoria = categorias[index]
+                if categoria and subcampo is not None:
+                    return categoria.get(subcampo)
+            return None
+        return extraer_categoria
+    
+    if campo == 'especificaciones' and 'condicion' in campo_config:
+        titulo_seccion = campo_config['condicion']['tituloSeccion']
+        # Extraer el dato, que puede ser string o lista
+        try:
+            dato = campo_config['subcampo']['seccionList']['condicion']['dato']
+        except (KeyError, TypeError):
+            # Si la estructura del campo es inválida, el valor siempre falta
+            return lambda producto, contexto: None
+        
+        def extraer_spec(producto, contexto):
+            indice = contexto.get('especificaciones')
+            if indice is None:
+                indice = indexar_especificaciones(producto.get('especificaciones') or [])
+                contexto['especificaciones'] = indice
+            return buscar_especificacion(indice, titulo_seccion, dato)
+        return extraer_spec
+    
+    # Campo no soportado: el valor siempre falta
+    return lambda producto, contexto: None
+
+# Función para construir la proyección de MongoDB con los campos que lee la estructura
+# Las especificaciones se recortan en el servidor con $filter (MongoDB 4.4+) a las
+# secciones y datos que referencia el schema
+def crear_proyeccion(estructura):
+    proyeccion = {'sku': 1, 'categorias.clave': 1}
+    titulos = []
+    datos = []
+    
+    for campo_config in estructura:
+        campo = campo_config.get('campo')
+        if campo is None or 'texto' in campo_config:
+            continue
+        
+        if campo == 'marca' or campo == 'nombreProducto':
+            proyeccion[campo] = 1
+        elif campo == 'categorias' and isinstance(campo_config.get('subcampo'), str):
+            proyeccion['categorias.' + campo_config['subcampo']] = 1
+        elif campo == 'especificaciones' and 'condicion' in campo_config:
+            titulo_seccion = campo_config['condicion']['tituloSeccion']
+            try:
+                dato = campo_config['subcampo']['seccionList']['condicion']['dato']
+            except (KeyError, TypeError):
+                continue
+            if titulo_seccion not in titulos:
+                titulos.append(titulo_seccion)
+            for alternativa in (dato if isinstance(dato, list) else [dato]):
+                if alternativa not in datos:
+                    datos.append(alternativa)
+    
+    if titulos:
+        secciones = {'$filter': {
+            'input': {'$ifNull': ['$especificaciones', []]},
+            'as': 'seccion',
+            'cond': {'$in': ['$$seccion.tituloSeccion', titulos]}
+        }}
+        proyeccion['especificaciones'] = {'$map': {
+            'input': secciones,
+            'as': 'seccion',
+            'in': {
+                'tituloSeccion': '$$seccion.tituloSeccion',
+                'seccionList': {'$filter': {
+                    'input': {'$ifNull': ['$$seccion.seccionList', []]},
+                    'as': 'item',
+                    'cond': {'$in': ['$$item.dato', datos]}
+                }}
+            }
+        }}
+    
+    return proyeccion
+
+# Función para compilar la estructura de un schema en un plan de extracción
+# Cada paso es una tupla (texto, extractor, transformador, marcador, nombre):
+# - texto: valor fijo para los pasos de texto estático (extractor es None)
+# - extractor/transformador: funciones ya resueltas para el campo
+# - marcador: texto que se usa cuando el campo falta, ej: [MARCA]
+# - nombre: encabezado de la columna individual, o None si el paso no tiene columna
+def compilar_estructura(estructura):
+    pasos = []
+    encabezados = ['SKU', 'Nombre Completo']
+    
+    for campo_config in estructura:
+        tiene_campo = 'campo' in campo_config
+        nombre = obtener_nombre_campo(campo_config) if tiene_campo else None
+        marcador = f"[{campo_config['campo'].upper()}]" if tiene_campo else None
+        
+        if 'texto' in campo_config:
+            pasos.append((campo_config['texto'], None, None, marcador, nombre))
+        else:
+            transformador = crear_transformador(campo_config.get('transformacion'))
+            pasos.append((None, crear_extractor(campo_config), transformador, marcador, nombre))
+        
+        if nombre is not None:
+            encabezados.append(nombre)
+    
+    return {
+        'pasos': pasos,
+        # Extractores de los pasos de campo, en orden (para obtener los valores crudos)
+        'extractores': [paso[1] for paso in pasos if paso[1] is not None],
+        'encabezados': encabezados,
+        # Nombres de las columnas individuales (compartidos por los resultados del schema)
+        'nombres_campos': tuple(encabezados[2:]),
+        'proyeccion': crear_proyeccion(estructura),
+        # Versión de la estructura: cambia si se modifica el schema
+        'version': hashlib.sha1(json.dumps(estructura, sort_keys=True).encode('utf-8')).hexdigest()
+    }
+
+# Función para compilar un schema completo (ver compilar_estructura)
+def compilar_schema(schema):
+    plan = compilar_estructura(schema['estructuraNombreProducto'])
+    plan['tipo'] = schema['tipo']
+    plan['coleccion'] = schema['coleccion']
+    return plan
+
+# Resultado del nombre de un producto. Es compacto porque se guardan millones en memoria:
+# - nombre_completo: el nombre armado, con el marcador de cada campo faltante
+# - valores: tupla con el valor de cada columna individual (el marcador si falta)
+# - faltantes: máscara de bits, el bit i indica que falta el campo de la columna i
+# - nombres: encabezados de las columnas, una sola tupla por schema (plan['nombres_campos'])
+class ResultadoNombre:
+    __slots__ = ('nombre_completo', 'valores', 'faltantes', 'nombres')
+    
+    def __init__(self, nombre_completo, valores, faltantes, nombres):
+        self.nombre_completo = nombre_completo
+        self.valores = valores
+        self.faltantes = faltantes
+        self.nombres = nombres
+    
+    # Indica si la columna i es un campo faltante
+    def falta(self, i):
+        return self.faltantes >> i & 1 == 1
+    
+    # Nombres de los campos faltantes, en el orden de las columnas
+    def campos_faltantes(self):
+        if not self.faltantes:
+            return []
+        return [nombre for i, nombre in enumerate(self.nombres) if self.faltantes >> i & 1]
+    
+    # Formato con diccionarios (JSON Lines, cache SQLite y respuestas del servicio)
+    def a_dict(self):
+        return {
+            'nombreCompleto': self.nombre_completo,
+            'partes': [{'nombre': nombre, 'valor': valor, 'faltante': self.faltantes >> i & 1 == 1}
+                       for i, (nombre, valor) in enumerate(zip(self.nombres, self.valores))],
+            'algunFaltante': self.faltantes != 0
+        }
+    
+    def __eq__(self, otro):
+        if not isinstance(otro, ResultadoNombre):
+            return NotImplemented
+        return (self.nombre_completo == otro.nombre_completo and self.valores == otro.valores
+                and self.faltantes == otro.faltantes and self.nombres == otro.nombres)
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f'ResultadoNombre({self.a_dict()})'
+    
+    # Se serializa como una tupla (archivos parciales de los workers y del checkpoint)
+    def __reduce__(self):
+        return (ResultadoNombre, (self.nombre_completo, self.valores, self.faltantes, self.nombres))
+
+# Función para reconstruir un resultado desde su formato con diccionarios (ver a_dict)
+def resultado_desde_dict(datos, plan):
+    faltantes = 0
+    for i, parte in enumerate(datos['partes']):
+        if parte['faltante']:
+            faltantes |= 1 << i
+    return ResultadoNombre(datos['nombreCompleto'], tuple(parte['valor'] for parte in datos['partes']),
+                           faltantes, plan['nombres_campos'])
+
+# Resultados ya generados por (versión del schema, valores crudos de los campos)
+# Las variantes de un producto (colores, SKUs regionales) suelen tener los mismos valores
+# y comparten el mismo resultado, por eso los resultados no se deben modificar
+_cache_resultados = OrderedDict()
+_estadisticas_resultados = {'aciertos': 0, 'fallos': 0}
+# Protege el cache y sus estadísticas cuando generan nombres varios hilos (--hilos, --servicio)
+_bloqueo_resultados = threading.Lock()
+
+# Función para generar el nombre del producto
+# Recibe un plan de compilar_estructura/compilar_schema (o la estructura sin compilar)
+def generar_nombre_producto(producto, plan):
+    if not isinstance(plan, dict):
+        plan = compilar_estructura(plan)
+    return generar_nombre_desde_valores(plan, extraer_valores(producto, plan))
+
+# Función para obtener los valores crudos de los campos de un producto (en el orden de
+# los pasos del plan), antes de transformarlos
+def extraer_valores(producto, plan):
+    contexto = {}
+    return tuple([extractor(producto, contexto) for extractor in plan['extractores']])
+
+# Función para generar el nombre a partir de los valores crudos (ver extraer_valores),
+# reutilizando el resultado de productos con los mismos valores
+def generar_nombre_desde_valores(plan, valores):
+    # Solo se reutilizan resultados de valores de texto (los demás pueden no ser hashables)
+    if not all(valor is None or type(valor) is str for valor in valores):
+        return armar_resultado(plan, valores)
+    
+    clave = (plan['version'], valores)
+    with _bloqueo_resultados:
+        resultado = _cache_resultados.get(clave)
+        if resultado is not None:
+            _estadisticas_resultados['aciertos'] += 1
+            _cache_resultados.move_to_end(clave)
+            return resultado
+        _estadisticas_resultados['fallos'] += 1
+    
+    # El resultado se arma fuera del bloqueo; si otro hilo armó el mismo mientras tanto,
+    # queda cualquiera de los dos (son iguales)
+    resultado = armar_resultado(plan, valores)
+    with _bloqueo_resultados:
+        _cache_resultados[clave] = resultado
+        _cache_resultados.move_to_end(clave)
+        if len(_cache_resultados) > TAMANO_CACHE_RESULTADOS:
+            _cache_resultados.popitem(last=False)
+    return resultado
+
+# Función para armar el resultado de un producto a partir de los valores crudos de sus
+# campos (en el orden de los pasos del plan). Con pendientes solo se transforman los
+# valores marcados: el resto ya viene transformado (ver resultado_desde_pipeline)
+def armar_resultado(plan, valores, pendientes=None):
+    partes = []
+    valores_columnas = []
+    faltantes = 0
+    i = 0
+    
+    for texto, extractor, transformador, marcador, nombre in plan['pasos']:
+        if extractor is None:
+            # Texto estático
+            valor = texto
+            faltante = False
+        else:
+            valor = valores[i]
+            if valor and transformador is not None and (pendientes is None or pendientes[i]):
+                valor = transformador(valor)
+            faltante = not valor
+            i += 1
+        
+        # Para el nombre completo
+        if faltante:
+            partes.append(marcador)
+        elif valor:
+            partes.append(valor)
+        
+        # Para las columnas individuales (solo campos, no texto estático)
+        if nombre is not None:
+            if faltante:
+                faltantes |= 1 << len(valores_columnas)
+            valores_columnas.append(marcador if faltante else valor)
+    
+    return ResultadoNombre(' '.join(partes).strip(), tuple(valores_columnas), faltantes, plan['nombres_campos'])
+
+# Función para transformar un valor crudo de una columna: devuelve el texto que aporta al
+# nombre completo y a la columna individual, y si el campo falta
+def transformar_valor_columna(valor, transformador, marcador):
+    if valor and transformador is not None:
+        valor = transformador(valor)
+    if not valor:
+        return marcador, True
+    return valor, False
+
+# Función para generar los nombres de un lote de productos de un mismo schema por columnas:
+# se extrae cada campo de todos los productos, cada valor distinto de la columna se
+# transforma una sola vez y los nombres se arman al final uniendo las columnas.
+# Devuelve los resultados en el orden de los productos (como generar_nombre_producto)
+def generar_nombres_lote(productos, plan):
+    cantidad = len(productos)
+    contextos = [{} for _ in range(cantidad)]
+    columnas_texto = []
+    columnas_valores = []
+    columnas_faltantes = []
+    
+    for texto, extractor, transformador, marcador, nombre in plan['pasos']:
+        if extractor is None:
+            # Texto estático: el mismo valor en todas las filas
+            if texto:
+                columnas_texto.append(itertools.repeat(texto, cantidad))
+            if nombre is not None:
+                columnas_valores.append(itertools.repeat(texto, cantidad))
+            continue
+        
+        crudos = [extractor(producto, contexto) for producto, contexto in zip(productos, contextos)]
+        unicos = {}
+        transformados = []
+        for valor in crudos:
+            # Solo los textos se agrupan por valor (los demás pueden no ser hashables)
+            if valor is None or type(valor) is str:
+                transformado = unicos.get(valor)
+                if transformado is None:
+                    transformado = unicos[valor] = transformar_valor_columna(valor, transformador, marcador)
+            else:
+                transformado = transformar_valor_columna(valor, transformador, marcador)
+            transformados.append(transformado)
+        
+        textos = [transformado[0] for transformado in transformados]
+        columnas_texto.append(textos)
+        if nombre is not None:
+            bit = 1 << len(columnas_valores)
+            columnas_valores.append(textos)
+            columnas_faltantes.append([bit if transformado[1] else 0 for transformado in transformados])
+    
+    nombres = [' '.join(piezas).strip() for piezas in zip(*columnas_texto)] if columnas_texto else [''] * cantidad
+    valores = list(zip(*columnas_valores)) if columnas_valores else [()] * cantidad
+    faltantes = [sum(fila) for fila in zip(*columnas_faltantes)] if columnas_faltantes else [0] * cantidad
+    nombres_campos = plan['nombres_campos']
+    
+    return [ResultadoNombre(nombre_completo, valores_fila, faltantes_fila, nombres_campos)
+            for nombre_completo, valores_fila, faltantes_fila in zip(nombres, valores, faltantes)]
+
+# Función para recorrer un iterable (ej: cursor de MongoDB) en lotes de tamaño fijo
+# Solo se mantiene en memoria un lote a la vez
+def iterar_lotes(productos, tamano_lote):
+    iterador = iter(productos)
+    while True:
+        lote = list(itertools.islice(iterador, tamano_lote))
+        if not lote:
+            return
+        yield lote
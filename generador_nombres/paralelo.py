@@ -0,0 +1,209 @@
+# Generación en varios procesos (--workers)
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from .config import DB_NAME, BATCH_SIZE, TAMANO_LOTE_ESCRITURA
+from .motor import compilar_schema, generar_nombres_lote, iterar_lotes, estadisticas_cache_transformaciones
+from .cache import abrir_cache, cerrar_cache
+from .metricas import (
+    crear_metricas, instante_actual, marcar_etapa, medir_etapa, medir_iterador, metricas_schema,
+    registrar_producto_schema, registrar_lote_schema, combinar_metricas, registrar_progreso, diferencia_caches
+)
+from .mongo import (
+    conectar, abrir_escritura_mongo, proyeccion_con_escritura, registrar_escritura_mongo,
+    volcar_escritura_mongo, agrupar_por_coleccion
+)
+from .salidas import formato_con_fragmentos, agregar_resultado
+from .generacion import generar_resultado
+from .checkpoint import leer_filas_parciales
+
+# Conexión a MongoDB de cada proceso del pool (se abre una vez por proceso)
+_cliente_worker = None
+
+# Función que inicializa cada proceso del pool de workers
+def iniciar_worker():
+    global _cliente_worker
+    _cliente_worker = conectar()
+
+# Función para dividir la consulta de un schema grande en rangos de _id
+# Usa $bucketAuto para obtener límites con una cantidad similar de productos por rango
+def dividir_por_rangos(collection, query, productos_por_tarea):
+    total = collection.count_documents(query)
+    cantidad_rangos = -(-total // productos_por_tarea)
+    if cantidad_rangos <= 1:
+        return [query]
+    
+    buckets = collection.aggregate([
+        {'$match': query},
+        {'$bucketAuto': {'groupBy': '$_id', 'buckets': cantidad_rangos}}
+    ])
+    minimos = [bucket['_id']['min'] for bucket in buckets]
+    
+    consultas = []
+    for i, minimo in enumerate(minimos):
+        rango = {'$gte': minimo}
+        if i + 1 < len(minimos):
+            rango['$lt'] = minimos[i + 1]
+        consultas.append(dict(query, _id=rango))
+    return consultas
+
+# Función que ejecuta un worker: genera las filas de una consulta (un schema o un rango
+# de _id de un schema) y las guarda por lotes en un archivo parcial con pickle
+# Si la tarea trae la ruta del cache, el worker abre su propia conexión a SQLite; si trae
+# un campo de escritura, guarda los nombres en MongoDB con sus propios lotes de bulk_write.
+# Devuelve también las métricas del worker (etapas, datos del schema y aciertos y fallos
+# de sus caches durante la tarea)
+def procesar_tarea_schema(tarea):
+    cache = None
+    metricas = crear_metricas()
+    caches_antes = estadisticas_cache_transformaciones()
+    try:
+        plan = compilar_schema(tarea['schema'])
+        collection = _cliente_worker[DB_NAME][plan['coleccion']]
+        proyeccion = plan['proyeccion']
+        escritura = None
+        if tarea.get('escritura'):
+            proyeccion = proyeccion_con_escritura(proyeccion, tarea['escritura']['campo'])
+            escritura = abrir_escritura_mongo(collection, tarea['escritura']['campo'],
+                                              tarea['escritura']['tamano_lote'], tarea['escritura']['tipos'])
+            posicion = tarea['escritura']['posicion']
+        productos = collection.find(tarea['consulta'], proyeccion, batch_size=BATCH_SIZE)
+        if tarea.get('cache'):
+            cache = abrir_cache(tarea['cache'])
+        
+        total = 0
+        datos_schema = metricas_schema(metricas, plan['tipo'])
+        with open(tarea['ruta'], 'wb') as archivo:
+            for lote in medir_iterador(iterar_lotes(productos, BATCH_SIZE), metricas, 'consulta'):
+                if tarea.get('columnas'):
+                    inicio = instante_actual()
+                    resultados = generar_nombres_lote(lote, plan)
+                    instante = marcar_etapa(metricas, 'nombres', inicio)
+                    registrar_lote_schema(datos_schema, resultados, inicio, instante)
+                    filas = [(producto.get('sku', ''), resultado) for producto, resultado in zip(lote, resultados)]
+                    if escritura is not None:
+                        for producto, resultado in zip(lote, resultados):
+                            registrar_escritura_mongo(escritura, producto, resultado, posicion)
+                        marcar_etapa(metricas, 'escritura_mongo', instante)
+                    with medir_etapa(metricas, 'archivo_parcial'):
+                        pickle.dump(filas, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+                    total += len(filas)
+                    continue
+                filas = []
+                for producto in lote:
+                    inicio = instante_actual()
+                    resultado = generar_resultado(producto, plan, cache)
+                    filas.append((producto.get('sku', ''), resultado))
+                    instante = marcar_etapa(metricas, 'nombres', inicio)
+                    if escritura is not None:
+                        registrar_escritura_mongo(escritura, producto, resultado, posicion)
+                        instante = marcar_etapa(metricas, 'escritura_mongo', instante)
+                    registrar_producto_schema(datos_schema, resultado, inicio, instante)
+                with medir_etapa(metricas, 'archivo_parcial'):
+                    pickle.dump(filas, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+                total += len(filas)
+        
+        respuesta = {'total': total, 'error': None}
+        if escritura is not None:
+            with medir_etapa(metricas, 'escritura_mongo'):
+                volcar_escritura_mongo(escritura)
+            respuesta['actualizados'] = escritura['actualizados']
+            respuesta['sin_cambios'] = escritura['sin_cambios']
+        caches = diferencia_caches(caches_antes)
+        if cache is not None:
+            caches['nombres'] = {'aciertos': cache['aciertos'], 'fallos': cache['fallos']}
+        respuesta['metricas'] = {'etapas': metricas['etapas'], 'schemas': metricas['schemas'], 'caches': caches}
+        return respuesta
+    except Exception as e:
+        return {'total': 0, 'error': str(e)}
+    finally:
+        if cache is not None:
+            cerrar_cache(cache)
+
+# Función para generar la salida usando un pool de procesos
+# Cada schema (o rango de _id si tiene más de productos_por_tarea productos) se procesa
+# en un worker que escribe un archivo parcial; el proceso principal arma las pestañas
+# en el orden original de los schemas a medida que terminan sus tareas
+def generar_salida_multi_schema_paralelo(db, datos_schemas, nombre_archivo, workers, productos_por_tarea,
+                                         formato='xlsx', ruta_cache=None, campo_escritura=None,
+                                         tamano_lote_escritura=TAMANO_LOTE_ESCRITURA, metricas=None,
+                                         columnas=False, fragmentos=None):
+    formato_salida = formato_con_fragmentos(formato, fragmentos)
+    salida = formato_salida['abrir'](nombre_archivo)
+    grupos = agrupar_por_coleccion(datos_schemas)
+    pestanas_creadas = 0
+    
+    with tempfile.TemporaryDirectory() as directorio, \
+            ProcessPoolExecutor(max_workers=workers, initializer=iniciar_worker) as pool:
+        # Enviar todas las tareas al pool
+        for i, schema_data in enumerate(datos_schemas):
+            schema_data['futuros'] = []
+            schema_data['rutas'] = []
+            try:
+                query = {'categorias.clave': schema_data['tipo']}
+                consultas = dividir_por_rangos(db[schema_data['coleccion']], query, productos_por_tarea)
+            except Exception as e:
+                schema_data['error'] = str(e)
+                continue
+            
+            for j, consulta in enumerate(consultas):
+                ruta = os.path.join(directorio, f'{i}_{j}.pkl')
+                schema_data['rutas'].append(ruta)
+                schema_data['futuros'].append(pool.submit(procesar_tarea_schema, {
+                    'schema': {
+                        'tipo': schema_data['tipo'],
+                        'coleccion': schema_data['coleccion'],
+                        'estructuraNombreProducto': schema_data['estructura']
+                    },
+                    'consulta': consulta,
+                    'ruta': ruta,
+                    'cache': ruta_cache,
+                    'columnas': columnas,
+                    'escritura': {
+                        'campo': campo_escritura,
+                        'tamano_lote': tamano_lote_escritura,
+                        'tipos': [datos['tipo'] for datos in grupos[schema_data['coleccion']]],
+                        'posicion': next(k for k, datos in enumerate(grupos[schema_data['coleccion']])
+                                         if datos is schema_data)
+                    } if campo_escritura else None
+                }))
+        
+        # Armar las pestañas en el orden de los schemas
+        for schema_data in datos_schemas:
+            print(f'\nProcesando: {schema_data["tipo"]}')
+            schema_data['total_productos'] = 0
+            resultados = [futuro.result() for futuro in schema_data['futuros']]
+            errores = [r['error'] for r in resultados if r['error']]
+            if metricas is not None:
+                for resultado in resultados:
+                    if 'metricas' in resultado:
+                        combinar_metricas(metricas, resultado['metricas'])
+            if schema_data.get('error'):
+                errores.insert(0, schema_data['error'])
+            
+            if errores:
+                print(f'Error al procesar {schema_data["tipo"]}: {errores[0]}')
+                continue
+            
+            if sum(r['total'] for r in resultados) > 0:  # Solo crear pestaña si hay productos
+                with medir_etapa(metricas, 'escritura'):
+                    pestana = formato_salida['crear_pestana'](salida, schema_data['plan'], schema_data['nombre_pestana'])
+                    for ruta in schema_data['rutas']:
+                        for sku, resultado in leer_filas_parciales(ruta):
+                            agregar_resultado(pestana, sku, resultado)
+                        os.remove(ruta)
+                with medir_etapa(metricas, 'guardado'):
+                    schema_data['total_productos'] = formato_salida['cerrar_pestana'](pestana)
+                pestanas_creadas += 1
+                if metricas is not None:
+                    registrar_progreso(metricas, schema_data['total_productos'])
+            print(f'Productos encontrados: {schema_data["total_productos"]}')
+            if campo_escritura:
+                print(f'Guardado en MongoDB ({campo_escritura}): '
+                      f'{sum(r.get("actualizados", 0) for r in resultados)} actualizados, '
+                      f'{sum(r.get("sin_cambios", 0) for r in resultados)} sin cambios')
+    
+    with medir_etapa(metricas, 'guardado'):
+        formato_salida['guardar'](salida)
+    return pestanas_creadas
@@ -0,0 +1,178 @@
+# Motor pipeline: compila la estructura de un schema a un aggregate de MongoDB
+from .motor import TRANSFORMADORES, armar_resultado
+
+# Caracteres que str.strip() considera espacios: el nombre armado en MongoDB se
+# recorta con $trim usando los mismos caracteres. Es la lista de los códigos con
+# str.isspace(), escrita literal para no recorrer todo Unicode al importar el módulo
+ESPACIOS_PYTHON = '\x09\x0a\x0b\x0c\x0d\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000'
+
+# Valores que en Python cuentan como vacíos (el campo se marca como faltante)
+VALORES_VACIOS = [None, '', False, 0, [], {}]
+
+# Función para crear la expresión de agregación que extrae el valor crudo de un campo
+# (equivalente a crear_extractor); los campos no soportados devuelven null
+def crear_expresion_campo(campo_config):
+    campo = campo_config['campo']
+    
+    if campo == 'marca' or campo == 'nombreProducto':
+        return '$' + campo
+    
+    if campo == 'categorias':
+        subcampo = campo_config.get('subcampo')
+        if not isinstance(subcampo, str):
+            return {'$literal': None}
+        return {'$let': {
+            'vars': {'categoria': {'$arrayElemAt': [{'$ifNull': ['$categorias', []]}, campo_config.get('index', 0)]}},
+            'in': '$$categoria.' + subcampo
+        }}
+    
+    if campo == 'especificaciones' and 'condicion' in campo_config:
+        titulo_seccion = campo_config['condicion']['tituloSeccion']
+        try:
+            dato = campo_config['subcampo']['seccionList']['condicion']['dato']
+        except (KeyError, TypeError):
+            return {'$literal': None}
+        
+        # Se prueban las alternativas en el orden del schema: gana la primera que existe
+        # (aunque su valor esté vacío), tomando su primera aparición, igual que el índice
+        alternativas = dato if isinstance(dato, list) else [dato]
+        expresion = {'$literal': None}
+        for i in reversed(range(len(alternativas))):
+            items = {'$reduce': {
+                'input': '$$secciones',
+                'initialValue': [],
+                'in': {'$concatArrays': ['$$value', {'$filter': {
+                    'input': {'$ifNull': ['$$this.seccionList', []]},
+                    'as': 'item',
+                    'cond': {'$eq': ['$$item.dato', alternativas[i]]}
+                }}]}
+            }}
+            expresion = {'$let': {
+                'vars': {f'items{i}': items},
+                'in': {'$cond': [
+                    {'$gt': [{'$size': f'$$items{i}'}, 0]},
+                    {'$let': {'vars': {'item': {'$arrayElemAt': [f'$$items{i}', 0]}}, 'in': '$$item.valor'}},
+                    expresion
+                ]}
+            }}
+        return {'$let': {
+            'vars': {'secciones': {'$filter': {
+                'input': {'$ifNull': ['$especificaciones', []]},
+                'as': 'seccion',
+                'cond': {'$eq': ['$$seccion.tituloSeccion', titulo_seccion]}
+            }}},
+            'in': expresion
+        }}
+    
+    return {'$literal': None}
+
+# Función para crear la expresión que indica si un valor cuenta como faltante
+def expresion_vacio(valor):
+    return {'$in': [{'$ifNull': [valor, None]}, {'$literal': VALORES_VACIOS}]}
+
+# Función para crear la expresión de una transformación que MongoDB resuelve igual que
+# Python (solo con textos ASCII); None si la transformación se aplica en el cliente
+def crear_expresion_transformacion(transformacion, valor):
+    if transformacion == 'mayuscula':
+        return {'$toUpper': valor}
+    if transformacion == 'minuscula':
+        return {'$toLower': valor}
+    if transformacion == 'capitalize':
+        return {'$concat': [
+            {'$toUpper': {'$substrCP': [valor, 0, 1]}},
+            {'$toLower': {'$substrCP': [valor, 1, {'$strLenCP': valor}]}}
+        ]}
+    return None
+
+# Función para crear la expresión que indica si un valor es un texto ASCII
+# ($toUpper/$toLower de MongoDB solo coinciden con Python para caracteres ASCII)
+def expresion_texto_ascii(valor):
+    return {'$cond': [
+        {'$eq': [{'$type': valor}, 'string']},
+        {'$regexMatch': {'input': valor, 'regex': '^[\\x00-\\x7F]*$'}},
+        False
+    ]}
+
+# Función para compilar la estructura de un schema en un pipeline de agregación que
+# genera el nombre en MongoDB (requiere MongoDB 4.4+). Cada documento devuelto tiene:
+# - v: el valor de cada campo del schema, ya transformado si MongoDB pudo hacerlo
+# - p: por campo, True si la transformación queda pendiente para el cliente
+#   (singular, o textos no ASCII / valores que no son texto)
+# - n: el nombre completo, o null si algún campo quedó pendiente
+# campos_extra son campos del producto que se devuelven tal cual (ej: los del nombre guardado)
+def crear_pipeline(estructura, query, campos_extra=()):
+    campos = [campo_config for campo_config in estructura
+              if 'campo' in campo_config and 'texto' not in campo_config]
+    conservar = {'sku': 1}
+    for campo in campos_extra:
+        conservar[campo] = 1
+    
+    # 1. Valores crudos de cada campo
+    crudos = dict(conservar, c=[crear_expresion_campo(campo_config) for campo_config in campos])
+    
+    # 2. Transformaciones que MongoDB resuelve igual que Python
+    valores = []
+    pendientes = []
+    for i, campo_config in enumerate(campos):
+        crudo = {'$arrayElemAt': ['$c', i]}
+        transformacion = campo_config.get('transformacion')
+        if transformacion not in TRANSFORMADORES:
+            valores.append(crudo)
+            pendientes.append(False)
+            continue
+        
+        expresion = crear_expresion_transformacion(transformacion, '$$valor')
+        if expresion is None:
+            valores.append(crudo)
+            pendientes.append({'$not': [expresion_vacio(crudo)]})
+            continue
+        
+        resoluble = {'$and': [{'$not': [expresion_vacio('$$valor')]}, expresion_texto_ascii('$$valor')]}
+        valores.append({'$let': {'vars': {'valor': crudo}, 'in': {'$cond': [resoluble, expresion, '$$valor']}}})
+        pendientes.append({'$let': {'vars': {'valor': crudo}, 'in': {'$and': [
+            {'$not': [expresion_vacio('$$valor')]},
+            {'$not': [expresion_texto_ascii('$$valor')]}
+        ]}}})
+    transformados = dict(conservar, v=valores, p=pendientes)
+    
+    # 3. Nombre completo: partes no vacías (o el marcador del campo) separadas por espacio
+    partes = []
+    i = 0
+    for campo_config in estructura:
+        if 'texto' in campo_config:
+            if campo_config['texto']:
+                partes.append({'$literal': campo_config['texto']})
+        elif 'campo' in campo_config:
+            valor = {'$arrayElemAt': ['$v', i]}
+            partes.append({'$cond': [expresion_vacio(valor), f"[{campo_config['campo'].upper()}]", valor]})
+            i += 1
+    unido = {'$reduce': {
+        'input': partes,
+        'initialValue': '',
+        'in': {'$cond': [{'$eq': ['$$value', '']}, '$$this', {'$concat': ['$$value', ' ', '$$this']}]}
+    }}
+    solo_textos = {'$allElementsTrue': [{'$map': {
+        'input': '$v',
+        'as': 'valor',
+        'in': {'$or': [expresion_vacio('$$valor'), {'$eq': [{'$type': '$$valor'}, 'string']}]}
+    }}]}
+    nombre = dict(conservar, v=1, p=1, n={'$cond': [
+        {'$and': [{'$not': [{'$anyElementTrue': ['$p']}]}, solo_textos]},
+        {'$trim': {'input': unido, 'chars': ESPACIOS_PYTHON}},
+        None
+    ]})
+    
+    return [
+        {'$match': query},
+        {'$project': crudos},
+        {'$project': transformados},
+        {'$project': nombre}
+    ]
+
+# Función para armar el resultado de un producto a partir de un documento del pipeline
+# (mismo formato que generar_nombre_producto); aplica las transformaciones pendientes
+def resultado_desde_pipeline(documento, plan):
+    resultado = armar_resultado(plan, documento.get('v') or [], documento.get('p') or [])
+    if documento.get('n') is not None:
+        resultado.nombre_completo = documento['n']
+    return resultado
@@ -0,0 +1,391 @@
+# Formatos de salida (xlsx, csv, jsonl, parquet) y fragmentos numerados
+import json
+import os
+import csv
+from functools import partial
+from .config import BATCH_SIZE, FILAS_MAXIMAS_EXCEL, FILAS_ENTRE_CONTROLES_TAMANO
+from .schemas import validar_nombre_pestana
+
+# Función para abrir una salida de un archivo por schema (CSV, JSON Lines o Parquet)
+# nombre_archivo se usa como base: productos_output.csv -> productos_output_<pestaña>.csv
+def abrir_salida_archivos(nombre_archivo):
+    base, extension = os.path.splitext(nombre_archivo)
+    return {
+        'base': base,
+        'extension': extension
+    }
+
+# Función para obtener la ruta del archivo de un schema en una salida de archivos
+def ruta_archivo_pestana(salida, nombre_pestana):
+    return f"{salida['base']}_{nombre_pestana}{salida['extension']}"
+
+# Función para crear el archivo CSV de un schema con sus encabezados
+# Además de las columnas del Excel agrega 'Campos Faltantes' (nombres separados por coma)
+def crear_pestana_csv(salida, plan, nombre_pestana):
+    ruta = ruta_archivo_pestana(salida, nombre_pestana)
+    archivo = open(ruta, 'w', encoding='utf-8', newline='')
+    escritor = csv.writer(archivo)
+    escritor.writerow(plan['encabezados'] + ['Campos Faltantes'])
+    return {
+        'plan': plan,
+        'total': 0,
+        'agregar': agregar_resultado_csv,
+        'ruta': ruta,
+        'archivo': archivo,
+        'escritor': escritor
+    }
+
+# Función para agregar el resultado de un producto como fila del CSV
+def agregar_resultado_csv(pestana, sku, resultado):
+    fila = [sku, resultado.nombre_completo]
+    fila.extend(valor or '' for valor in resultado.valores)
+    fila.append(', '.join(resultado.campos_faltantes()))
+    pestana['escritor'].writerow(fila)
+
+# Función para crear el archivo JSON Lines de un schema (un objeto JSON por producto)
+def crear_pestana_jsonl(salida, plan, nombre_pestana):
+    ruta = ruta_archivo_pestana(salida, nombre_pestana)
+    return {
+        'plan': plan,
+        'total': 0,
+        'agregar': agregar_resultado_jsonl,
+        'ruta': ruta,
+        'archivo': open(ruta, 'w', encoding='utf-8')
+    }
+
+# Función para agregar el resultado de un producto como línea del JSON Lines
+def agregar_resultado_jsonl(pestana, sku, resultado):
+    datos = resultado.a_dict()
+    registro = {
+        'sku': sku,
+        'nombreCompleto': datos['nombreCompleto'],
+        'algunFaltante': datos['algunFaltante'],
+        'partes': datos['partes']
+    }
+    pestana['archivo'].write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+
+# Función para cerrar el archivo de un schema; devuelve la cantidad de productos escritos
+def cerrar_pestana_archivo(pestana):
+    pestana['archivo'].close()
+    return pestana['total']
+
+# Función para descartar el archivo de un schema (vacío o con error)
+def eliminar_pestana_archivo(salida, pestana):
+    if 'archivo' in pestana:
+        pestana['archivo'].close()
+    else:
+        pestana['escritor'].close()
+    if os.path.exists(pestana['ruta']):
+        os.remove(pestana['ruta'])
+
+# Función para guardar una salida de archivos: cada archivo ya se cerró con su pestaña
+def guardar_salida_archivos(salida):
+    return None
+
+# Función para obtener nombres de columna únicos (agrega _2, _3... a los repetidos)
+def columnas_unicas(nombres):
+    vistos = {}
+    columnas = []
+    for nombre in nombres:
+        vistos[nombre] = vistos.get(nombre, 0) + 1
+        columnas.append(nombre if vistos[nombre] == 1 else f'{nombre}_{vistos[nombre]}')
+    return columnas
+
+# Función para crear el archivo Parquet de un schema (requiere pyarrow)
+# Columnas: sku, nombreCompleto, el valor de cada campo (nulo si falta) y un
+# booleano <campo>_faltante por campo. Se escribe un row group cada BATCH_SIZE productos
+def crear_pestana_parquet(salida, plan, nombre_pestana):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('El formato parquet requiere pyarrow (pip install pyarrow)')
+    
+    nombres = columnas_unicas(plan['encabezados'][2:])
+    campos = [pa.field('sku', pa.string()), pa.field('nombreCompleto', pa.string())]
+    campos.extend(pa.field(nombre, pa.string()) for nombre in nombres)
+    campos.extend(pa.field(f'{nombre}_faltante', pa.bool_()) for nombre in nombres)
+    esquema = pa.schema(campos)
+    
+    ruta = ruta_archivo_pestana(salida, nombre_pestana)
+    return {
+        'plan': plan,
+        'total': 0,
+        'agregar': agregar_resultado_parquet,
+        'ruta': ruta,
+        'esquema': esquema,
+        'escritor': pq.ParquetWriter(ruta, esquema),
+        'columnas': [[] for _ in campos]
+    }
+
+# Función para agregar el resultado de un producto a las columnas en memoria del Parquet
+def agregar_resultado_parquet(pestana, sku, resultado):
+    columnas = pestana['columnas']
+    cantidad_partes = len(resultado.valores)
+    columnas[0].append(None if sku is None else str(sku))
+    columnas[1].append(resultado.nombre_completo)
+    for i, valor in enumerate(resultado.valores):
+        faltante = resultado.falta(i)
+        columnas[2 + i].append(None if faltante or valor is None else str(valor))
+        columnas[2 + cantidad_partes + i].append(faltante)
+    
+    if len(columnas[0]) >= BATCH_SIZE:
+        volcar_parquet(pestana)
+
+# Función para escribir las columnas en memoria como un row group del Parquet
+def volcar_parquet(pestana):
+    import pyarrow as pa
+    
+    if pestana['columnas'][0]:
+        tabla = pa.Table.from_arrays(pestana['columnas'], schema=pestana['esquema'])
+        pestana['escritor'].write_table(tabla)
+        pestana['columnas'] = [[] for _ in pestana['columnas']]
+
+# Función para cerrar el archivo Parquet de un schema; devuelve la cantidad de productos
+def cerrar_pestana_parquet(pestana):
+    volcar_parquet(pestana)
+    pestana['escritor'].close()
+    return pestana['total']
+
+# Funciones de la salida Excel: el módulo excel (y con él openpyxl) se importa recién
+# cuando se usa el formato xlsx. Las filas las agrega la función guardada en cada pestaña
+def abrir_salida_excel(nombre_archivo):
+    from .excel import abrir_salida_excel
+    return abrir_salida_excel(nombre_archivo)
+
+def crear_pestana_salida_excel(salida, plan, nombre_pestana):
+    from .excel import crear_pestana_salida_excel
+    return crear_pestana_salida_excel(salida, plan, nombre_pestana)
+
+def cerrar_pestana_excel(pestana):
+    from .excel import cerrar_pestana_excel
+    return cerrar_pestana_excel(pestana)
+
+def eliminar_pestana_excel(salida, pestana):
+    from .excel import eliminar_pestana_excel
+    return eliminar_pestana_excel(salida, pestana)
+
+def guardar_salida_excel(salida):
+    from .excel import guardar_salida_excel
+    return guardar_salida_excel(salida)
+
+# Formatos de salida: funciones para abrir la salida, crear la pestaña (o archivo) de
+# cada schema, cerrarla, descartarla y guardar la salida completa. Cada pestaña guarda
+# en 'agregar' la función que escribe el resultado de un producto
+SALIDAS = {
+    'xlsx': {
+        'abrir': abrir_salida_excel,
+        'crear_pestana': crear_pestana_salida_excel,
+        'cerrar_pestana': cerrar_pestana_excel,
+        'eliminar_pestana': eliminar_pestana_excel,
+        'guardar': guardar_salida_excel
+    },
+    'csv': {
+        'abrir': abrir_salida_archivos,
+        'crear_pestana': crear_pestana_csv,
+        'cerrar_pestana': cerrar_pestana_archivo,
+        'eliminar_pestana': eliminar_pestana_archivo,
+        'guardar': guardar_salida_archivos
+    },
+    'jsonl': {
+        'abrir': abrir_salida_archivos,
+        'crear_pestana': crear_pestana_jsonl,
+        'cerrar_pestana': cerrar_pestana_archivo,
+        'eliminar_pestana': eliminar_pestana_archivo,
+        'guardar': guardar_salida_archivos
+    },
+    'parquet': {
+        'abrir': abrir_salida_archivos,
+        'crear_pestana': crear_pestana_parquet,
+        'cerrar_pestana': cerrar_pestana_parquet,
+        'eliminar_pestana': eliminar_pestana_archivo,
+        'guardar': guardar_salida_archivos
+    }
+}
+
+# Función para obtener el formato de salida con fragmentos: las filas de cada schema se
+# dividen en pestañas o archivos numerados (Laptops, Laptops_2, ...) según limites:
+# - filas_por_pestana: filas por pestaña de Excel (siempre como máximo FILAS_MAXIMAS_EXCEL)
+# - filas_por_archivo: filas por archivo (con xlsx, un workbook por fragmento)
+# - bytes_por_archivo: tamaño aproximado por archivo (csv, jsonl y parquet)
+# Si no hay límites se usa el formato sin fragmentos de SALIDAS
+def formato_con_fragmentos(formato, limites=None):
+    limites_usuario = {clave: valor for clave, valor in (limites or {}).items() if valor}
+    limites = dict(limites_usuario)
+    if formato == 'xlsx':
+        limites['filas_por_pestana'] = min(limites.get('filas_por_pestana', FILAS_MAXIMAS_EXCEL), FILAS_MAXIMAS_EXCEL)
+    if not limites:
+        return SALIDAS[formato]
+    return {
+        'abrir': partial(abrir_salida_fragmentada, formato=formato, limites=limites,
+                         manifiesto=bool(limites_usuario)),
+        'crear_pestana': crear_pestana_fragmentada,
+        'cerrar_pestana': cerrar_pestana_fragmentada,
+        'eliminar_pestana': eliminar_pestana_fragmentada,
+        'guardar': guardar_salida_fragmentada
+    }
+
+# Función para abrir una salida con fragmentos. Los fragmentos comparten la salida del
+# formato (el workbook o la base de los nombres de archivo), salvo con xlsx y
+# filas_por_archivo, donde cada fragmento es un workbook propio. Con manifiesto (o si
+# algún schema se dividió) al guardar se escribe <base>_manifest.json
+def abrir_salida_fragmentada(nombre_archivo, formato, limites, manifiesto=False):
+    base, extension = os.path.splitext(nombre_archivo)
+    libro_por_fragmento = formato == 'xlsx' and 'filas_por_archivo' in limites
+    filas = [limites[clave] for clave in ('filas_por_pestana', 'filas_por_archivo') if clave in limites]
+    return {
+        'formato': formato,
+        'salidas': SALIDAS[formato],
+        'salida': None if libro_por_fragmento else SALIDAS[formato]['abrir'](nombre_archivo),
+        'nombre_archivo': nombre_archivo,
+        'base': base,
+        'extension': extension,
+        'limites': limites,
+        'filas_por_fragmento': min(filas) if filas else None,
+        'bytes_por_fragmento': limites.get('bytes_por_archivo'),
+        'manifiesto': manifiesto,
+        'pestanas': []
+    }
+
+# Función para obtener el nombre del fragmento numero de una pestaña: el primero conserva
+# el nombre y los siguientes agregan _2, _3... sin pasar los 31 caracteres de Excel
+def nombre_fragmento(nombre_pestana, numero):
+    if numero == 1:
+        return nombre_pestana
+    sufijo = f'_{numero}'
+    return validar_nombre_pestana(nombre_pestana[:31 - len(sufijo)] + sufijo)
+
+# Función para abrir el fragmento numero de una pestaña con el formato de la salida
+def abrir_fragmento(salida, plan, nombre_pestana, numero):
+    nombre = nombre_fragmento(nombre_pestana, numero)
+    if salida['salida'] is None:
+        # Workbook propio: productos_output.xlsx -> productos_output_<fragmento>.xlsx
+        salida_fragmento = salida['salidas']['abrir'](f"{salida['base']}_{nombre}{salida['extension']}")
+    else:
+        salida_fragmento = salida['salida']
+    fragmento = salida['salidas']['crear_pestana'](salida_fragmento, plan, nombre)
+    fragmento['salida_fragmento'] = salida_fragmento
+    fragmento['nombre_fragmento'] = nombre
+    fragmento['primer_sku'] = None
+    fragmento['ultimo_sku'] = None
+    return fragmento
+
+# Función para crear la pestaña de un schema en una salida con fragmentos
+# La pestaña escribe en su fragmento actual y abre el siguiente al llegar a los límites
+def crear_pestana_fragmentada(salida, plan, nombre_pestana):
+    pestana = {
+        'plan': plan,
+        'total': 0,
+        'agregar': agregar_resultado_fragmentado,
+        'salida_fragmentos': salida,
+        'nombre_pestana': nombre_pestana,
+        'fragmento': abrir_fragmento(salida, plan, nombre_pestana, 1),
+        'fragmentos_cerrados': []
+    }
+    salida['pestanas'].append(pestana)
+    return pestana
+
+# Función para obtener el tamaño en bytes escrito en el archivo de un fragmento
+# En parquet no incluye las filas que todavía no se volcaron en un row group
+def tamano_fragmento(fragmento):
+    if 'archivo' in fragmento:
+        return fragmento['archivo'].tell()
+    return os.path.getsize(fragmento['ruta'])
+
+# Función para indicar si el fragmento actual de una pestaña llegó a sus límites
+def fragmento_lleno(salida, fragmento):
+    if salida['filas_por_fragmento'] is not None and fragmento['total'] >= salida['filas_por_fragmento']:
+        return True
+    return (salida['bytes_por_fragmento'] is not None and fragmento['total'] > 0
+            and fragmento['total'] % FILAS_ENTRE_CONTROLES_TAMANO == 0
+            and tamano_fragmento(fragmento) >= salida['bytes_por_fragmento'])
+
+# Función para cerrar el fragmento actual de una pestaña (un workbook propio se guarda)
+def cerrar_fragmento(pestana):
+    salida = pestana['salida_fragmentos']
+    fragmento = pestana['fragmento']
+    salida['salidas']['cerrar_pestana'](fragmento)
+    if fragmento['salida_fragmento'] is not salida['salida']:
+        salida['salidas']['guardar'](fragmento['salida_fragmento'])
+    pestana['fragmentos_cerrados'].append(fragmento)
+    pestana['fragmento'] = None
+
+# Función para agregar el resultado de un producto al fragmento actual de la pestaña
+def agregar_resultado_fragmentado(pestana, sku, resultado):
+    fragmento = pestana['fragmento']
+    salida = pestana['salida_fragmentos']
+    if fragmento_lleno(salida, fragmento):
+        numero = len(pestana['fragmentos_cerrados']) + 2
+        cerrar_fragmento(pestana)
+        fragmento = abrir_fragmento(salida, pestana['plan'], pestana['nombre_pestana'], numero)
+        pestana['fragmento'] = fragmento
+        if salida['formato'] == 'xlsx' and salida['salida'] is not None:
+            # Dejar la pestaña nueva a continuación de la anterior (su hoja se crea con la
+            # primera fila, en la posición que tiene en la lista de pestañas del workbook)
+            anterior = pestana['fragmentos_cerrados'][-1]
+            pestanas = [otra for otra in salida['salida']['pestanas'] if otra is not fragmento]
+            pestanas.insert(next(i for i, otra in enumerate(pestanas) if otra is anterior) + 1, fragmento)
+            salida['salida']['pestanas'] = pestanas
+    
+    fragmento['agregar'](fragmento, sku, resultado)
+    fragmento['total'] += 1
+    if fragmento['primer_sku'] is None:
+        fragmento['primer_sku'] = sku
+    fragmento['ultimo_sku'] = sku
+
+# Función para cerrar una pestaña con fragmentos; devuelve la cantidad de productos
+def cerrar_pestana_fragmentada(pestana):
+    cerrar_fragmento(pestana)
+    return pestana['total']
+
+# Función para descartar una pestaña con fragmentos (vacía o con error) y todos sus
+# fragmentos, incluidos los ya cerrados
+def eliminar_pestana_fragmentada(salida, pestana):
+    fragmentos = list(pestana['fragmentos_cerrados'])
+    if pestana['fragmento'] is not None:
+        fragmentos.append(pestana['fragmento'])
+    for fragmento in fragmentos:
+        salida_fragmento = fragmento['salida_fragmento']
+        if salida_fragmento is not salida['salida'] and fragmento is not pestana['fragmento']:
+            # Workbook propio ya guardado
+            if os.path.exists(salida_fragmento['nombre_archivo']):
+                os.remove(salida_fragmento['nombre_archivo'])
+        else:
+            salida['salidas']['eliminar_pestana'](salida_fragmento, fragmento)
+    salida['pestanas'].remove(pestana)
+
+# Función para guardar una salida con fragmentos y su manifiesto, que lista cada
+# fragmento con su archivo, pestaña, cantidad de filas y primer y último SKU
+def guardar_salida_fragmentada(salida):
+    if salida['salida'] is not None:
+        salida['salidas']['guardar'](salida['salida'])
+    
+    divididas = any(pestana['fragmentos_cerrados'][1:] for pestana in salida['pestanas'])
+    if not salida['manifiesto'] and not divididas:
+        return
+    
+    fragmentos = []
+    for pestana in salida['pestanas']:
+        for numero, fragmento in enumerate(pestana['fragmentos_cerrados'], 1):
+            fragmentos.append({
+                'tipo': pestana['plan'].get('tipo'),
+                'fragmento': numero,
+                'archivo': fragmento.get('ruta') or fragmento['salida_fragmento']['nombre_archivo'],
+                'pestana': fragmento['nombre_fragmento'],
+                'filas': fragmento['total'],
+                'primer_sku': fragmento['primer_sku'],
+                'ultimo_sku': fragmento['ultimo_sku']
+            })
+    ruta = f"{salida['base']}_manifest.json"
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump({
+            'formato': salida['formato'],
+            'limites': salida['limites'],
+            'fragmentos': fragmentos
+        }, archivo, ensure_ascii=False, indent=2, default=str)
+    print(f'Manifiesto de fragmentos: {ruta} ({len(fragmentos)} fragmentos)')
+
+# Función para agregar un resultado ya calculado a la pestaña de cualquier formato
+def agregar_resultado(pestana, sku, resultado):
+    pestana['agregar'](pestana, sku, resultado)
+    pestana['total'] += 1
@@ -0,0 +1,294 @@
+# Carga y validación de los schemas JSON
+import json
+import os
+import re
+import glob
+import hashlib
+from .config import DIRECTORIO_CACHE_SCHEMAS
+from .motor import TRANSFORMADORES, compilar_schema
+
+# Campos del producto que puede leer un schema (los demás siempre faltarían)
+CAMPOS_SOPORTADOS = ('marca', 'nombreProducto', 'categorias', 'especificaciones')
+
+# Versión del cache de schemas en disco: cambia si cambian las reglas de validación
+VERSION_CACHE_SCHEMAS = 1
+
+# Tokens de un JSON con comentarios: strings (se conservan, aunque contengan // o /*),
+# comentarios de línea y comentarios de bloque
+PATRON_COMENTARIOS = re.compile(r'"(?:[^"\\\n]|\\.)*"|//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+# Función para quitar los comentarios // y /* */ de un JSON sin tocar los strings
+# Los comentarios de bloque dejan sus saltos de línea, así los errores de JSON indican
+# la línea correcta del archivo
+def quitar_comentarios(texto):
+    def reemplazar(coincidencia):
+        token = coincidencia.group()
+        if token.startswith('"'):
+            return token
+        return '\n' * token.count('\n')
+    return PATRON_COMENTARIOS.sub(reemplazar, texto)
+
+# Función para cargar un schema desde un archivo JSON (con comentarios)
+def cargar_schema(ruta_archivo):
+    with open(ruta_archivo, 'r', encoding='utf-8') as f:
+        return json.loads(quitar_comentarios(f.read()))
+
+# Función para cargar todos los schemas válidos de la carpeta (ver abrir_registro; no
+# usa el cache de schemas)
+def cargar_todos_los_schemas(directorio):
+    registro = abrir_registro(directorio, usar_cache=False)
+    imprimir_registro(registro)
+    return schemas_del_registro(registro)
+
+# Función para validar un elemento de estructuraNombreProducto; devuelve sus problemas
+def validar_campo_schema(campo_config):
+    if not isinstance(campo_config, dict) or ('campo' not in campo_config and 'texto' not in campo_config):
+        return ['debe ser un objeto con "campo" o "texto"']
+    if 'texto' in campo_config:
+        return [] if isinstance(campo_config['texto'], str) else ['"texto" debe ser un string']
+    
+    errores = []
+    campo = campo_config['campo']
+    if campo not in CAMPOS_SOPORTADOS:
+        errores.append(f'campo no soportado: {campo} (opciones: {", ".join(CAMPOS_SOPORTADOS)})')
+    elif campo == 'categorias':
+        index = campo_config.get('index', 0)
+        if not isinstance(index, int) or isinstance(index, bool):
+            errores.append('"index" debe ser un entero')
+        if not isinstance(campo_config.get('subcampo'), (str, type(None))):
+            errores.append('"subcampo" debe ser un string')
+    elif campo == 'especificaciones':
+        condicion = campo_config.get('condicion')
+        if not isinstance(condicion, dict) or not isinstance(condicion.get('tituloSeccion'), str):
+            errores.append('falta condicion.tituloSeccion')
+        try:
+            dato = campo_config['subcampo']['seccionList']['condicion']['dato']
+        except (KeyError, TypeError):
+            errores.append('falta subcampo.seccionList.condicion.dato')
+        else:
+            datos = dato if isinstance(dato, list) else [dato]
+            if not datos or not all(isinstance(alternativa, str) for alternativa in datos):
+                errores.append('subcampo.seccionList.condicion.dato debe ser un string o una lista de strings')
+    
+    transformacion = campo_config.get('transformacion')
+    if transformacion is not None and transformacion != 'ninguna' and transformacion not in TRANSFORMADORES:
+        errores.append(f'transformación desconocida: {transformacion} '
+                       f'(opciones: ninguna, {", ".join(TRANSFORMADORES)})')
+    return errores
+
+# Función para validar un schema sin conectarse a MongoDB
+# Revisa los campos requeridos y cada elemento de la estructura, de modo que un schema
+# válido siempre se puede compilar. Devuelve la lista de problemas (vacía si es válido)
+def validar_schema(schema):
+    if not isinstance(schema, dict):
+        return ['El schema debe ser un objeto JSON']
+    errores = [f'"{campo}" debe ser un string no vacío' for campo in ('coleccion', 'tipo')
+               if not isinstance(schema.get(campo), str) or not schema.get(campo)]
+    
+    estructura = schema.get('estructuraNombreProducto')
+    if not isinstance(estructura, list) or not estructura:
+        errores.append('"estructuraNombreProducto" debe ser una lista no vacía')
+        return errores
+    for i, campo_config in enumerate(estructura, 1):
+        errores.extend(f'Elemento {i} de estructuraNombreProducto: {error}'
+                       for error in validar_campo_schema(campo_config))
+    return errores
+
+# Función para leer y validar el contenido de un archivo de schema
+# Devuelve (schema, errores); schema es None si el JSON no se pudo leer
+def leer_schema_validado(contenido):
+    try:
+        schema = json.loads(quitar_comentarios(contenido.decode('utf-8')))
+    except ValueError as e:
+        return None, [f'JSON inválido: {e}']
+    return schema, validar_schema(schema)
+
+# Función para validar un archivo de schema (sin usar el registro ni su cache)
+def validar_archivo_schema(ruta_archivo):
+    with open(ruta_archivo, 'rb') as archivo:
+        schema, errores = leer_schema_validado(archivo.read())
+    if not errores:
+        try:
+            compilar_schema(schema)
+        except Exception as e:
+            errores.append(f'No se pudo compilar: {e}')
+    return errores
+
+# Función para leer el cache de schemas en disco: {archivo: {'firma', 'hash', 'schema', 'errores'}}
+# Un cache ilegible o de otra versión se ignora
+def leer_cache_schemas(ruta):
+    try:
+        with open(ruta, 'r', encoding='utf-8') as archivo:
+            cache = json.load(archivo)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != VERSION_CACHE_SCHEMAS:
+        return {}
+    return cache.get('archivos') or {}
+
+# Función para obtener la ruta del cache de una carpeta de schemas: un archivo en
+# DIRECTORIO_CACHE_SCHEMAS con el hash de la ruta absoluta de la carpeta
+def ruta_cache_schemas(directorio):
+    huella = hashlib.sha1(os.path.abspath(directorio).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(DIRECTORIO_CACHE_SCHEMAS, f'schemas_{huella}.json')
+
+# Función para guardar el cache de schemas del registro (si no se puede escribir, el
+# registro sigue funcionando sin cache)
+def guardar_cache_schemas(registro):
+    archivos = {nombre: {'firma': entrada['firma'], 'hash': entrada['hash'],
+                         'schema': entrada['schema'], 'errores': entrada['errores']}
+                for nombre, entrada in registro['archivos'].items()}
+    temporal = registro['ruta_cache'] + '.tmp'
+    try:
+        os.makedirs(os.path.dirname(registro['ruta_cache']), exist_ok=True)
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump({'version': VERSION_CACHE_SCHEMAS, 'archivos': archivos}, archivo, ensure_ascii=False)
+        os.replace(temporal, registro['ruta_cache'])
+    except OSError as e:
+        print(f'No se pudo guardar el cache de schemas: {e}')
+
+# Función para leer un archivo de schema del registro: usa el cache en disco si el
+# archivo tiene la misma fecha de modificación y tamaño (sin leerlo) o el mismo hash
+# (leyéndolo, pero sin volver a parsearlo ni validarlo). Los schemas válidos se compilan
+def leer_entrada_registro(registro, ruta, firma):
+    guardado = registro['cache'].get(os.path.basename(ruta))
+    if guardado is not None and guardado['firma'] == firma:
+        huella, schema, errores = guardado['hash'], guardado['schema'], list(guardado['errores'])
+    else:
+        registro['cache_pendiente'] = True
+        with open(ruta, 'rb') as archivo:
+            contenido = archivo.read()
+        huella = hashlib.sha1(contenido).hexdigest()
+        if guardado is not None and guardado['hash'] == huella:
+            schema, errores = guardado['schema'], list(guardado['errores'])
+        else:
+            schema, errores = leer_schema_validado(contenido)
+    
+    entrada = {'firma': firma, 'hash': huella, 'schema': schema, 'errores': errores, 'datos': None}
+    if not errores:
+        try:
+            entrada['datos'] = preparar_schema(schema)
+        except Exception as e:
+            errores.append(f'No se pudo compilar: {e}')
+    return entrada
+
+# Función para abrir el registro de schemas de una carpeta: lee, valida y compila cada
+# schema al abrirlo, así los errores aparecen antes de consultar MongoDB. Los archivos
+# sin cambios desde la ejecución anterior se toman del cache en disco (en
+# DIRECTORIO_CACHE_SCHEMAS, ver ruta_cache_schemas); con usar_cache=False no se lee ni
+# se escribe. recargar_registro vuelve a leer solo los archivos nuevos o modificados
+def abrir_registro(directorio, usar_cache=True):
+    ruta_cache = ruta_cache_schemas(directorio) if usar_cache else None
+    registro = {
+        'directorio': directorio,
+        'ruta_cache': ruta_cache,
+        'cache': leer_cache_schemas(ruta_cache) if ruta_cache else {},
+        # Indica si el cache en disco quedó desactualizado (se leyó algún archivo)
+        'cache_pendiente': False,
+        # {nombre de archivo: entrada}, en el orden en que glob lista la carpeta
+        'archivos': {}
+    }
+    recargar_registro(registro)
+    return registro
+
+# Función para revisar la carpeta del registro (sondeo por fecha de modificación y
+# tamaño) y volver a leer solo los archivos nuevos o modificados. Si un schema que era
+# válido pasa a ser inválido se conserva su último plan compilado ('datos'), así un
+# servicio no pierde el tipo mientras se corrige el archivo.
+# Devuelve la lista de cambios [(archivo, 'nuevo' | 'modificado' | 'eliminado')]
+def recargar_registro(registro):
+    archivos = registro['archivos']
+    cambios = []
+    vistos = set()
+    for ruta in glob.glob(os.path.join(registro['directorio'], '*.json')):
+        nombre = os.path.basename(ruta)
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            continue  # Se borró entre el glob y el stat
+        vistos.add(nombre)
+        firma = [estado.st_mtime_ns, estado.st_size]
+        anterior = archivos.get(nombre)
+        if anterior is not None and anterior['firma'] == firma:
+            continue
+        
+        try:
+            entrada = leer_entrada_registro(registro, ruta, firma)
+        except OSError as e:
+            entrada = {'firma': firma, 'hash': None, 'schema': None, 'errores': [f'No se pudo leer: {e}'],
+                       'datos': None}
+        if anterior is not None and anterior['hash'] == entrada['hash']:
+            anterior['firma'] = firma  # Solo cambió la fecha de modificación
+            registro['cache_pendiente'] = True
+            continue
+        if anterior is not None and entrada['datos'] is None:
+            entrada['datos'] = anterior['datos']
+        archivos[nombre] = entrada
+        cambios.append((nombre, 'modificado' if anterior is not None else 'nuevo'))
+    
+    for nombre in [nombre for nombre in archivos if nombre not in vistos]:
+        del archivos[nombre]
+        cambios.append((nombre, 'eliminado'))
+    
+    if registro['ruta_cache'] and (cambios or registro['cache_pendiente']):
+        guardar_cache_schemas(registro)
+        registro['cache_pendiente'] = False
+    return cambios
+
+# Función para obtener los schemas válidos del registro, en el orden de la carpeta
+def schemas_del_registro(registro):
+    return [entrada['schema'] for entrada in registro['archivos'].values() if not entrada['errores']]
+
+# Función para obtener los datos compilados de los schemas del registro (ver
+# preparar_schema), incluido el último plan válido de los schemas que dejaron de serlo
+def datos_del_registro(registro):
+    return [entrada['datos'] for entrada in registro['archivos'].values() if entrada['datos'] is not None]
+
+# Función para obtener los problemas de cada schema inválido del registro: {archivo: errores}
+def errores_del_registro(registro):
+    return {nombre: entrada['errores'] for nombre, entrada in registro['archivos'].items() if entrada['errores']}
+
+# Función para mostrar el estado de los archivos del registro (todos o los indicados)
+def imprimir_registro(registro, nombres=None):
+    for nombre in nombres if nombres is not None else list(registro['archivos']):
+        entrada = registro['archivos'].get(nombre)
+        if entrada is None:
+            print(f'Schema eliminado: {nombre}')
+        elif not entrada['errores']:
+            print(f'Schema cargado: {nombre} (Tipo: {entrada["schema"]["tipo"]})')
+        else:
+            anterior = ' (se sigue usando la versión anterior)' if entrada['datos'] is not None else ''
+            print(f'Schema inválido: {nombre}{anterior}')
+            for error in entrada['errores']:
+                print(f'  - {error}')
+
+# Función para validar y limpiar el nombre de pestaña de Excel
+def validar_nombre_pestana(nombre):
+    # Excel tiene límites: máximo 31 caracteres, no puede contener: \ / ? * [ ]
+    caracteres_prohibidos = ['\\', '/', '?', '*', '[', ']']
+    nombre_limpio = nombre
+    
+    # Remover caracteres prohibidos
+    for char in caracteres_prohibidos:
+        nombre_limpio = nombre_limpio.replace(char, '')
+    
+    # Limitar a 31 caracteres
+    if len(nombre_limpio) > 31:
+        nombre_limpio = nombre_limpio[:31]
+    
+    # Si quedó vacío, usar un nombre por defecto
+    if not nombre_limpio:
+        nombre_limpio = "Productos"
+    
+    return nombre_limpio
+
+# Función para preparar los datos de un schema para generar la salida: nombre de la
+# pestaña (o archivo) y plan compilado
+def preparar_schema(schema, nombre_pestana=None):
+    return {
+        'tipo': schema['tipo'],
+        'coleccion': schema['coleccion'],
+        'nombre_pestana': nombre_pestana or validar_nombre_pestana(schema['tipo']),
+        'estructura': schema['estructuraNombreProducto'],
+        'plan': compilar_schema(schema)
+    }
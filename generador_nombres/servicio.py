@@ -0,0 +1,201 @@
+# Servicio HTTP local de nombres a pedido (--servicio)
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .motor import compilar_schema, generar_nombre_producto
+from .mongo import agrupar_por_coleccion, consultar_coleccion
+from .schemas import validar_schema, recargar_registro, imprimir_registro, datos_del_registro
+
+# Función para generar los nombres de un producto con los schemas de sus categorias.clave
+# Si se indica tipo solo se usa ese schema. Devuelve una lista de {'tipo', 'sku', 'resultado'}
+def nombrar_producto(producto, schemas_por_tipo, tipo=None):
+    if tipo is not None:
+        tipos = [tipo]
+    else:
+        tipos = []
+        for categoria in producto.get('categorias') or []:
+            clave = categoria.get('clave') if isinstance(categoria, dict) else None
+            if clave in schemas_por_tipo and clave not in tipos:
+                tipos.append(clave)
+    
+    nombres = []
+    for tipo_producto in tipos:
+        for schema_data in schemas_por_tipo[tipo_producto]:
+            nombres.append({
+                'tipo': tipo_producto,
+                'sku': producto.get('sku', ''),
+                'resultado': generar_nombre_producto(producto, schema_data['plan']).a_dict()
+            })
+    return nombres
+
+# Función para generar los nombres de una lista de SKUs consultándolos en MongoDB
+# (una consulta por colección con la proyección de sus schemas)
+def nombrar_skus(db, datos_schemas, schemas_por_tipo, skus, tipo=None):
+    if tipo is not None:
+        datos_schemas = schemas_por_tipo[tipo]
+    
+    nombres = []
+    encontrados = set()
+    for coleccion_nombre, datos_grupo in agrupar_por_coleccion(datos_schemas).items():
+        for producto in consultar_coleccion(db[coleccion_nombre], datos_grupo, skus=skus):
+            encontrados.add(producto.get('sku'))
+            nombres.extend(nombrar_producto(producto, schemas_por_tipo, tipo))
+    return {
+        'nombres': nombres,
+        'no_encontrados': [sku for sku in skus if sku not in encontrados]
+    }
+
+# Función para probar un schema (cargado o nuevo, sin guardarlo) con una muestra de
+# productos de su colección
+def vista_previa_schema(db, schema, muestra):
+    plan = compilar_schema(schema)
+    productos = db[schema['coleccion']].find({'categorias.clave': schema['tipo']}, plan['proyeccion']).limit(muestra)
+    return {
+        'encabezados': plan['encabezados'],
+        'nombres': [{'sku': producto.get('sku', ''), 'resultado': generar_nombre_producto(producto, plan).a_dict()}
+                    for producto in productos]
+    }
+
+# Error de una petición al servicio (se responde con el código HTTP indicado)
+class ErrorPeticion(Exception):
+    def __init__(self, codigo, mensaje):
+        super().__init__(mensaje)
+        self.codigo = codigo
+
+# Función para leer un campo obligatorio del cuerpo de una petición
+def campo_peticion(datos, campo, tipo):
+    valor = datos.get(campo)
+    if not isinstance(valor, tipo):
+        raise ErrorPeticion(400, f"Falta el campo '{campo}' o no es válido")
+    return valor
+
+# Función para atender una petición al servicio; devuelve el cuerpo de la respuesta
+# GET  /salud        -> estado del servicio
+# GET  /schemas      -> tipos cargados con sus encabezados
+# POST /nombre       -> {"producto": {...}, "tipo": opcional}: nombra un documento
+# POST /skus         -> {"skus": [...], "tipo": opcional}: consulta y nombra SKUs
+# POST /vista-previa -> {"tipo": ...} o {"schema": {...}}, "muestra": opcional (5)
+def atender_peticion(servicio, metodo, ruta, datos):
+    schemas_por_tipo = servicio['schemas_por_tipo']
+    tipo = datos.get('tipo') if datos else None
+    if tipo is not None and not isinstance(tipo, str):
+        raise ErrorPeticion(400, "El campo 'tipo' debe ser un string")
+    if tipo is not None and tipo not in schemas_por_tipo and ruta != '/vista-previa':
+        raise ErrorPeticion(404, f'No hay schema para el tipo: {tipo}')
+    
+    if metodo == 'GET' and ruta == '/salud':
+        return {'estado': 'ok', 'schemas': len(servicio['datos_schemas'])}
+    if metodo == 'GET' and ruta == '/schemas':
+        return {'schemas': [{'tipo': schema_data['tipo'], 'coleccion': schema_data['coleccion'],
+                             'encabezados': schema_data['plan']['encabezados']}
+                            for schema_data in servicio['datos_schemas']]}
+    if metodo == 'POST' and ruta == '/nombre':
+        producto = campo_peticion(datos, 'producto', dict)
+        return {'nombres': nombrar_producto(producto, schemas_por_tipo, tipo)}
+    if metodo == 'POST' and ruta == '/skus':
+        skus = campo_peticion(datos, 'skus', list)
+        return nombrar_skus(servicio['db'], servicio['datos_schemas'], schemas_por_tipo, skus, tipo)
+    if metodo == 'POST' and ruta == '/vista-previa':
+        if 'schema' in datos:
+            schema = campo_peticion(datos, 'schema', dict)
+            errores = validar_schema(schema)
+            if errores:
+                raise ErrorPeticion(400, 'Schema inválido: ' + '; '.join(errores))
+        elif tipo in schemas_por_tipo:
+            schema_data = schemas_por_tipo[tipo][0]
+            schema = {'tipo': tipo, 'coleccion': schema_data['coleccion'],
+                      'estructuraNombreProducto': schema_data['estructura']}
+        else:
+            raise ErrorPeticion(400, "Falta el campo 'tipo' o 'schema'")
+        muestra = datos.get('muestra', 5)
+        if not isinstance(muestra, int) or isinstance(muestra, bool) or muestra < 1:
+            raise ErrorPeticion(400, "El campo 'muestra' debe ser un entero mayor que 0")
+        return vista_previa_schema(servicio['db'], schema, muestra)
+    raise ErrorPeticion(404, f'Ruta no encontrada: {metodo} {ruta}')
+
+# Manejador HTTP del servicio: lee el JSON del cuerpo y responde JSON
+# Los datos del servicio están en self.server.servicio (ver ejecutar_servicio)
+class ManejadorServicio(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.responder('GET')
+    
+    def do_POST(self):
+        self.responder('POST')
+    
+    def responder(self, metodo):
+        try:
+            datos = {}
+            largo = int(self.headers.get('Content-Length') or 0)
+            if largo:
+                try:
+                    datos = json.loads(self.rfile.read(largo))
+                except ValueError:
+                    raise ErrorPeticion(400, 'El cuerpo no es un JSON válido')
+                if not isinstance(datos, dict):
+                    raise ErrorPeticion(400, 'El cuerpo debe ser un objeto JSON')
+            codigo, respuesta = 200, atender_peticion(self.server.servicio, metodo, self.path.split('?')[0], datos)
+        except ErrorPeticion as e:
+            codigo, respuesta = e.codigo, {'error': str(e)}
+        except Exception as e:
+            codigo, respuesta = 500, {'error': str(e)}
+        
+        cuerpo = json.dumps(respuesta, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+    
+    def log_message(self, formato, *argumentos):
+        # Sin una línea por petición (el servicio atiende muchas peticiones cortas)
+        pass
+
+# Función para crear los datos del servicio a partir de los schemas compilados
+def crear_estado_servicio(db, datos_schemas):
+    schemas_por_tipo = {}
+    for schema_data in datos_schemas:
+        schemas_por_tipo.setdefault(schema_data['tipo'], []).append(schema_data)
+    return {
+        'db': db,
+        'datos_schemas': datos_schemas,
+        'schemas_por_tipo': schemas_por_tipo
+    }
+
+# Función (hilo) que revisa la carpeta del registro de schemas cada intervalo segundos
+# y, si cambió algún archivo, reemplaza los datos del servicio de una sola vez: las
+# peticiones en curso terminan con los schemas anteriores y las nuevas usan los nuevos
+def vigilar_schemas(servidor, registro, intervalo, detener):
+    while not detener.wait(intervalo):
+        try:
+            cambios = recargar_registro(registro)
+        except Exception as e:
+            print(f'Error al recargar los schemas: {e}')
+            continue
+        if cambios:
+            imprimir_registro(registro, [nombre for nombre, _ in cambios])
+            servidor.servicio = crear_estado_servicio(servidor.servicio['db'], datos_del_registro(registro))
+
+# Función para iniciar el servicio HTTP de nombres: los schemas quedan compilados y el
+# cliente de MongoDB (con su pool de conexiones) se reutiliza entre peticiones.
+# Con un registro de schemas (ver abrir_registro) y un intervalo, los archivos nuevos o
+# modificados se recargan sin reiniciar el servicio.
+# Cada petición se atiende en su propio hilo; corre hasta Ctrl+C
+def ejecutar_servicio(db, datos_schemas, host, puerto, registro=None, intervalo_recarga=0):
+    servidor = ThreadingHTTPServer((host, puerto), ManejadorServicio)
+    servidor.servicio = crear_estado_servicio(db, datos_schemas)
+    
+    detener = threading.Event()
+    if registro is not None and intervalo_recarga > 0:
+        threading.Thread(target=vigilar_schemas, args=(servidor, registro, intervalo_recarga, detener),
+                         daemon=True).start()
+    print(f'\nServicio de nombres escuchando en http://{host}:{servidor.server_address[1]}')
+    if registro is not None and intervalo_recarga > 0:
+        print(f'Los schemas de {registro["directorio"]} se recargan cada {intervalo_recarga} s')
+    print('Presionar Ctrl+C para detenerlo')
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print('\nServicio detenido')
+    finally:
+        detener.set()
+        servidor.server_close()
@@ -0,0 +1,325 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import bson
+
+try:
+    import resource
+except ImportError:  # resource no existe en Windows
+    resource = None
+
+# Configuración
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Raíz del repositorio, donde está el paquete generador_nombres
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+
+# Valores de ejemplo para el catálogo sintético
+MARCAS = ['hp', 'Lenovo', 'ASUS', 'Dell', 'acer', 'Logitech', 'Samsung', 'Epson']
+NOMBRES_PRODUCTO = ['ideapad 3', 'Victus 15', 'vivobook go', 'Inspiron 14', 'G203 lightsync', 'EcoTank L3250']
+VALORES_ESPECIFICACION = [
+    'Intel Core i5', 'AMD Ryzen 7', '1235U', '16 GB', '8 GB', '512 GB', 'SSD', 'Windows 11 Home',
+    '15.6"', '23.8"', 'Negro', 'Plata', 'Inalámbrico', 'USB', 'RGB', '8000 DPI', 'Tinta continua'
+]
+
+# Función para importar el paquete generador_nombres (sus módulos se cargan al usarlos)
+def cargar_generador():
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    import generador_nombres
+    return generador_nombres
+
+# Función para obtener las especificaciones que lee un schema: lista de (tituloSeccion, datos)
+def especificaciones_del_schema(schema):
+    especificaciones = []
+    for campo_config in schema['estructuraNombreProducto']:
+        if campo_config.get('campo') != 'especificaciones' or 'condicion' not in campo_config:
+            continue
+        try:
+            dato = campo_config['subcampo']['seccionList']['condicion']['dato']
+        except (KeyError, TypeError):
+            continue
+        datos = dato if isinstance(dato, list) else [dato]
+        especificaciones.append((campo_config['condicion']['tituloSeccion'], datos))
+    return especificaciones
+
+# Función para generar un catálogo sintético con productos de los tipos de los schemas
+# Cada producto tiene las secciones que lee su schema (con una alternativa al azar si el
+# dato es una lista), secciones_extra secciones que ningún schema usa y, con probabilidad
+# proporcion_faltantes, le falta cada campo que lee el schema. Los productos se generan
+# de a uno (no se arma la lista completa)
+def generar_catalogo(schemas, cantidad, secciones_extra=3, proporcion_faltantes=0.1, semilla=1):
+    rnd = random.Random(semilla)
+    especificaciones_por_tipo = {schema['tipo']: especificaciones_del_schema(schema) for schema in schemas}
+    fecha_base = datetime(2024, 1, 1)
+    
+    for i in range(cantidad):
+        schema = schemas[i % len(schemas)]
+        secciones = {}
+        for titulo_seccion, datos in especificaciones_por_tipo[schema['tipo']]:
+            if rnd.random() >= proporcion_faltantes:
+                secciones.setdefault(titulo_seccion, []).append({
+                    'dato': rnd.choice(datos),
+                    'valor': rnd.choice(VALORES_ESPECIFICACION)
+                })
+        for j in range(secciones_extra):
+            secciones[f'Sección adicional {j + 1}'] = [
+                {'dato': f'Dato {k + 1}', 'valor': rnd.choice(VALORES_ESPECIFICACION)} for k in range(4)
+            ]
+        
+        producto = {
+            '_id': i,
+            'sku': f'SKU-{i:07d}',
+            'categorias': [
+                {'clave': 'computo', 'descripcion': 'Cómputo'},
+                {'clave': schema['tipo'], 'descripcion': schema['tipo']}
+            ],
+            'especificaciones': [
+                {'tituloSeccion': titulo, 'seccionList': lista} for titulo, lista in secciones.items()
+            ],
+            'updatedAt': fecha_base + timedelta(minutes=i)
+        }
+        if rnd.random() >= proporcion_faltantes:
+            producto['marca'] = rnd.choice(MARCAS)
+        if rnd.random() >= proporcion_faltantes:
+            producto['nombreProducto'] = rnd.choice(NOMBRES_PRODUCTO)
+        yield producto
+
+# Función para guardar el catálogo en un archivo BSON (un documento tras otro, como los
+# escribe mongodump)
+def guardar_catalogo(productos, ruta):
+    with open(ruta, 'wb') as archivo:
+        for producto in productos:
+            archivo.write(bson.encode(producto))
+
+# Colección local de MongoDB: los productos se leen del archivo BSON del catálogo y se
+# decodifican en cada find, como llegarían del servidor, sin tenerlos en memoria.
+# Soporta las consultas que hace generar (categorias.clave con o sin $in, updatedAt con
+# $gt); la proyección no se aplica (en MongoDB la resuelve el servidor)
+class ColeccionLocal:
+    def __init__(self, ruta):
+        self.ruta = ruta
+    
+    def coincide(self, producto, query):
+        for campo, condicion in (query or {}).items():
+            if campo == 'categorias.clave':
+                valores = condicion['$in'] if isinstance(condicion, dict) else [condicion]
+                claves = {categoria.get('clave') for categoria in producto.get('categorias') or []}
+                if claves.isdisjoint(valores):
+                    return False
+            elif campo == 'updatedAt':
+                actualizado = producto.get('updatedAt')
+                if actualizado is None or not actualizado > condicion['$gt']:
+                    return False
+            else:
+                raise ValueError(f'Consulta no soportada por la colección local: {campo}')
+        return True
+    
+    def find(self, query=None, proyeccion=None, batch_size=None):
+        with open(self.ruta, 'rb') as archivo:
+            for producto in bson.decode_file_iter(archivo):
+                if self.coincide(producto, query):
+                    yield producto
+    
+    def count_documents(self, query):
+        return sum(1 for _ in self.find(query))
+
+# Cliente de MongoDB local: todas las colecciones tienen el mismo catálogo
+class ClienteLocal:
+    def __init__(self, ruta):
+        self.coleccion = ColeccionLocal(ruta)
+    
+    def __getitem__(self, nombre):
+        return self
+    
+    def __call__(self, *args, **kwargs):
+        return self
+    
+    def find(self, *args, **kwargs):
+        return self.coleccion.find(*args, **kwargs)
+    
+    def count_documents(self, *args, **kwargs):
+        return self.coleccion.count_documents(*args, **kwargs)
+    
+    def close(self):
+        pass
+
+# Función para obtener el pico de memoria residente de este proceso en MB (None si no se puede medir)
+def pico_memoria_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB, macOS bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+# Función para preparar los datos de los schemas igual que el subcomando generar
+def preparar_schemas(generador, schemas):
+    return [generador.preparar_schema(schema) for schema in schemas]
+
+# Función para limpiar los caches de transformaciones (cada medición empieza en frío)
+def limpiar_caches(generador):
+    generador.transformar_texto_cacheado.cache_clear()
+    generador.plural_a_singular.cache_clear()
+    generador.limpiar_cache_resultados()
+
+# Función para medir cada etapa por separado: consulta (decodificar los productos),
+# nombres (generar_nombre_producto, o generar_nombres_lote por lotes con columnas) y
+# escritura (agregar las filas y guardar la salida)
+def medir_etapas(generador, cliente, schemas, formato, directorio, columnas=False):
+    datos_schemas = preparar_schemas(generador, schemas)
+    grupos = generador.agrupar_por_coleccion(datos_schemas)
+    limpiar_caches(generador)
+    
+    inicio = time.perf_counter()
+    productos = []
+    for coleccion_nombre, datos_grupo in grupos.items():
+        productos.extend(generador.consultar_coleccion(cliente[coleccion_nombre], datos_grupo))
+    tiempo_consulta = time.perf_counter() - inicio
+    
+    planes_por_tipo = {}
+    for schema_data in datos_schemas:
+        planes_por_tipo.setdefault(schema_data['tipo'], []).append(schema_data)
+    
+    inicio = time.perf_counter()
+    resultados = []
+    if columnas:
+        productos_por_schema = {}
+        for producto in productos:
+            for categoria in producto.get('categorias') or []:
+                for schema_data in planes_por_tipo.get(categoria.get('clave'), []):
+                    productos_por_schema.setdefault(schema_data['tipo'], (schema_data, []))[1].append(producto)
+        for schema_data, productos_schema in productos_por_schema.values():
+            for i in range(0, len(productos_schema), generador.BATCH_SIZE):
+                lote = productos_schema[i:i + generador.BATCH_SIZE]
+                for producto, resultado in zip(lote, generador.generar_nombres_lote(lote, schema_data['plan'])):
+                    resultados.append((schema_data, producto.get('sku', ''), resultado))
+    else:
+        for producto in productos:
+            for categoria in producto.get('categorias') or []:
+                for schema_data in planes_por_tipo.get(categoria.get('clave'), []):
+                    resultados.append((schema_data, producto.get('sku', ''),
+                                       generador.generar_nombre_producto(producto, schema_data['plan'])))
+    tiempo_nombres = time.perf_counter() - inicio
+    
+    inicio = time.perf_counter()
+    formato_salida = generador.SALIDAS[formato]
+    salida = formato_salida['abrir'](os.path.join(directorio, f'etapas.{formato}'))
+    for schema_data in datos_schemas:
+        schema_data['pestana'] = formato_salida['crear_pestana'](salida, schema_data['plan'],
+                                                                 schema_data['nombre_pestana'])
+    for schema_data, sku, resultado in resultados:
+        generador.agregar_resultado(schema_data['pestana'], sku, resultado)
+    for schema_data in datos_schemas:
+        formato_salida['cerrar_pestana'](schema_data['pestana'])
+    formato_salida['guardar'](salida)
+    tiempo_escritura = time.perf_counter() - inicio
+    
+    return {
+        'consulta': tiempo_consulta,
+        'nombres': tiempo_nombres,
+        'escritura': tiempo_escritura,
+        'filas': len(resultados)
+    }
+
+# Función para medir el proceso completo con generar_salida_multi_schema
+def medir_completo(generador, cliente, schemas, formato, directorio, columnas=False):
+    datos_schemas = preparar_schemas(generador, schemas)
+    limpiar_caches(generador)
+    
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        generador.generar_salida_multi_schema(cliente, datos_schemas,
+                                              os.path.join(directorio, f'completo.{formato}'), formato,
+                                              columnas=columnas)
+    tiempo = time.perf_counter() - inicio
+    
+    filas = sum(schema_data['total_productos'] for schema_data in datos_schemas)
+    return {'total': tiempo, 'filas': filas}
+
+# Función que mide el proceso completo en un proceso nuevo (spawn, sin la memoria del
+# proceso principal) y devuelve también su pico de memoria: el catálogo se lee del
+# archivo, así el pico corresponde al proceso de generación en streaming
+def medir_completo_en_proceso(ruta_catalogo, schemas, formato, directorio, columnas=False):
+    generador = cargar_generador()
+    resultado = medir_completo(generador, ClienteLocal(ruta_catalogo), schemas, formato, directorio, columnas)
+    resultado['pico_memoria_mb'] = pico_memoria_mb()
+    return resultado
+
+# Función para leer los argumentos de la línea de comandos
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark del generador de nombres con un catálogo sintético')
+    parser.add_argument('--productos', type=int, default=20000, help='Cantidad de productos del catálogo')
+    parser.add_argument('--secciones-extra', type=int, default=3,
+                        help='Secciones de especificaciones por producto que ningún schema usa')
+    parser.add_argument('--faltantes', type=float, default=0.1,
+                        help='Probabilidad de que falte cada campo que lee el schema (0 a 1)')
+    parser.add_argument('--format', dest='formato', default='xlsx', help='Formato de salida a medir')
+    parser.add_argument('--motor', choices=['python', 'columnas'], default='python',
+                        help='Motor de nombres a medir (ver --motor del subcomando generar)')
+    parser.add_argument('--semilla', type=int, default=1, help='Semilla del generador de productos')
+    parser.add_argument('--json', metavar='ARCHIVO', help='Guarda los resultados en un archivo JSON')
+    return parser.parse_args(argv)
+
+# Función principal
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    generador = cargar_generador()
+    if args.formato not in generador.SALIDAS:
+        print(f'Formato no soportado: {args.formato} (opciones: {", ".join(sorted(generador.SALIDAS))})')
+        return
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        schemas = generador.cargar_todos_los_schemas(generador.SCHEMAS_DIR)
+    if not schemas:
+        print('No se encontraron schemas para el benchmark')
+        return
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        print(f'Generando catálogo sintético: {args.productos} productos, {len(schemas)} schemas')
+        ruta_catalogo = os.path.join(directorio, 'catalogo.bson')
+        guardar_catalogo(generar_catalogo(schemas, args.productos, args.secciones_extra, args.faltantes, args.semilla),
+                         ruta_catalogo)
+        
+        # El proceso completo (y el pico de memoria) se mide en otro proceso; la medición
+        # por etapas guarda todos los productos y resultados en listas, por eso no se
+        # incluye en el pico informado
+        columnas = args.motor == 'columnas'
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            completo = pool.submit(medir_completo_en_proceso, ruta_catalogo, schemas, args.formato, directorio,
+                                   columnas).result()
+        etapas = medir_etapas(generador, ClienteLocal(ruta_catalogo), schemas, args.formato, directorio, columnas)
+    
+    resultados = {
+        'productos': args.productos,
+        'formato': args.formato,
+        'motor': args.motor,
+        'filas': completo['filas'],
+        'segundos': round(completo['total'], 3),
+        'filas_por_segundo': round(completo['filas'] / completo['total'], 1) if completo['total'] else None,
+        'etapas': {etapa: round(etapas[etapa], 3) for etapa in ('consulta', 'nombres', 'escritura')},
+        'pico_memoria_mb': completo['pico_memoria_mb']
+    }
+    
+    print('-' * 60)
+    print(f'Filas generadas: {resultados["filas"]}')
+    print(f'Tiempo total: {resultados["segundos"]} s ({resultados["filas_por_segundo"]} filas/s)')
+    for etapa, segundos in resultados['etapas'].items():
+        print(f'  {etapa}: {segundos} s')
+    print(f'Pico de memoria: {resultados["pico_memoria_mb"]} MB')
+    print('-' * 60)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, ensure_ascii=False, indent=2)
+        print(f'Resultados guardados en: {args.json}')
+
+if __name__ == '__main__':
+    main()
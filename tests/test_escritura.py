@@ -0,0 +1,60 @@
+# Pruebas de --escribir-mongo con productos que pertenecen a varios schemas de la colección
+import os
+import shutil
+import tempfile
+import unittest
+from generador_nombres.schemas import preparar_schema
+from generador_nombres.generacion import generar_salida_multi_schema
+
+# Colección en memoria con lo que usa la escritura: $in sobre categorias.clave y bulk_write
+# con UpdateOne ($set por _id); cuenta las actualizaciones recibidas
+class ColeccionMemoria:
+    def __init__(self, productos):
+        self.productos = productos
+        self.actualizaciones = 0
+    
+    def find(self, query, proyeccion=None, batch_size=None, sort=None):
+        tipos = set(query['categorias.clave']['$in'])
+        return iter([producto for producto in self.productos
+                     if tipos & {categoria['clave'] for categoria in producto['categorias']}])
+    
+    def bulk_write(self, operaciones, ordered=True):
+        por_id = {producto['_id']: producto for producto in self.productos}
+        for operacion in operaciones:
+            por_id[operacion._filter['_id']].update(operacion._doc['$set'])
+        self.actualizaciones += len(operaciones)
+
+# Mouse aparece antes que Mouse-Gamer, así el nombre de un mouse gamer es el de Mouse
+SCHEMAS = [
+    {'coleccion': 'productos', 'tipo': 'Mouse', 'estructuraNombreProducto': [
+        {'texto': 'Mouse'}, {'campo': 'marca'}]},
+    {'coleccion': 'productos', 'tipo': 'Mouse-Gamer', 'estructuraNombreProducto': [
+        {'texto': 'Mouse Gamer'}, {'campo': 'marca'}]}
+]
+
+class PruebaEscrituraMongo(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.coleccion = ColeccionMemoria([
+            {'_id': 1, 'sku': 'SKU1', 'marca': 'Logitech', 'categorias': [{'clave': 'Mouse'}]},
+            {'_id': 2, 'sku': 'SKU2', 'marca': 'Razer', 'categorias': [{'clave': 'Mouse-Gamer'}, {'clave': 'Mouse'}]}
+        ])
+    
+    # Genera la salida guardando los nombres en nombreGenerado y devuelve las actualizaciones enviadas
+    def generar(self):
+        self.coleccion.actualizaciones = 0
+        datos_schemas = [preparar_schema(schema) for schema in SCHEMAS]
+        generar_salida_multi_schema({'productos': self.coleccion}, datos_schemas,
+                                    os.path.join(self.directorio, 'salida.jsonl'), 'jsonl',
+                                    campo_escritura='nombreGenerado')
+        return self.coleccion.actualizaciones
+    
+    def test_un_nombre_por_producto(self):
+        self.assertEqual(self.generar(), 2)
+        self.assertEqual(self.coleccion.productos[1]['nombreGenerado'], 'Mouse Razer')
+        # La siguiente ejecución no encuentra cambios
+        self.assertEqual(self.generar(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+# Pruebas de la salida Excel write-only: las hojas se crean con su primera fila
+import os
+import shutil
+import tempfile
+import unittest
+import openpyxl
+from generador_nombres.motor import compilar_schema, generar_nombre_producto
+from generador_nombres.excel import (
+    abrir_salida_excel, crear_pestana_salida_excel, agregar_resultado_excel, cerrar_pestana_excel,
+    eliminar_pestana_excel, guardar_salida_excel
+)
+
+class PruebaSalidaExcel(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.plan = compilar_schema({'coleccion': 'productos', 'tipo': 'Mouse',
+                                     'estructuraNombreProducto': [{'campo': 'marca'}]})
+        self.resultado = generar_nombre_producto({'marca': 'Logitech'}, self.plan)
+    
+    def test_hojas_en_el_orden_de_las_pestanas(self):
+        ruta = os.path.join(self.directorio, 'salida.xlsx')
+        salida = abrir_salida_excel(ruta)
+        pestanas = [crear_pestana_salida_excel(salida, self.plan, nombre) for nombre in ('A', 'B', 'C')]
+        # La pestaña vacía se descarta sin haber creado su hoja
+        self.assertIsNone(pestanas[1]['ws'])
+        eliminar_pestana_excel(salida, pestanas[1])
+        
+        # C recibe su primera fila antes que A, pero queda después
+        agregar_resultado_excel(pestanas[2], 'SKU1', self.resultado)
+        agregar_resultado_excel(pestanas[0], 'SKU2', self.resultado)
+        self.assertEqual(salida['wb'].sheetnames, ['A', 'C'])
+        
+        for pestana in (pestanas[0], pestanas[2]):
+            cerrar_pestana_excel(pestana)
+        guardar_salida_excel(salida)
+        wb = openpyxl.load_workbook(ruta)
+        self.assertEqual(wb.sheetnames, ['A', 'C'])
+        self.assertEqual(wb['C']['A2'].value, 'SKU1')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# Pruebas del modo incremental (--cache --incremental) con una colección en memoria
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from generador_nombres.schemas import preparar_schema
+from generador_nombres.cache import abrir_cache, cerrar_cache
+from generador_nombres.generacion import generar_salida_multi_schema
+
+# Colección en memoria con lo que usa consultar_coleccion: $in sobre categorias.clave,
+# updatedAt con $gt/$exists dentro de $or y orden por _id (la proyección se ignora)
+class ColeccionMemoria:
+    def __init__(self, productos):
+        self.productos = productos
+    
+    def find(self, query, proyeccion=None, batch_size=None, sort=None):
+        productos = [producto for producto in self.productos if cumple_consulta(producto, query)]
+        if sort:
+            productos.sort(key=lambda producto: producto['_id'])
+        return iter(productos)
+
+# Función para saber si un producto cumple una consulta de ColeccionMemoria
+def cumple_consulta(producto, query):
+    for campo, condicion in query.items():
+        if campo == 'categorias.clave':
+            claves = [categoria['clave'] for categoria in producto.get('categorias', [])]
+            if not set(claves) & set(condicion['$in']):
+                return False
+        elif campo == '$or':
+            if not any(cumple_consulta(producto, alternativa) for alternativa in condicion):
+                return False
+        elif campo == 'updatedAt':
+            if '$exists' in condicion:
+                if ('updatedAt' in producto) != condicion['$exists']:
+                    return False
+            elif 'updatedAt' not in producto or not producto['updatedAt'] > condicion['$gt']:
+                return False
+    return True
+
+# Schemas de prueba: dos tipos de la misma colección (se consultan en un solo grupo)
+SCHEMAS = [
+    {'coleccion': 'productos', 'tipo': 'Mouse', 'estructuraNombreProducto': [{'campo': 'marca'}]},
+    {'coleccion': 'productos', 'tipo': 'Laptops', 'estructuraNombreProducto': [{'campo': 'marca'}]}
+]
+
+class PruebaIncremental(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        inicio = datetime(2026, 1, 1)
+        self.productos = [
+            {'_id': i, 'sku': f'SKU{i}', 'marca': f'marca {i}', 'updatedAt': inicio,
+             'categorias': [{'clave': 'Mouse' if i % 2 else 'Laptops'}]}
+            for i in range(1, 21)
+        ]
+        self.db = {'productos': ColeccionMemoria(self.productos)}
+    
+    # Genera la salida jsonl con el cache y devuelve {pestaña: [sku, ...]}
+    def generar(self, ruta_cache, incremental):
+        cache = abrir_cache(ruta_cache)
+        try:
+            datos_schemas = [preparar_schema(schema) for schema in SCHEMAS]
+            generar_salida_multi_schema(self.db, datos_schemas, os.path.join(self.directorio, 'salida.jsonl'),
+                                        'jsonl', cache, incremental)
+        finally:
+            cerrar_cache(cache)
+        salida = {}
+        for tipo in ('Mouse', 'Laptops'):
+            ruta = os.path.join(self.directorio, f'salida_{tipo}.jsonl')
+            if os.path.exists(ruta):
+                with open(ruta, encoding='utf-8') as archivo:
+                    salida[tipo] = [json.loads(linea)['sku'] for linea in archivo]
+                os.remove(ruta)
+        return salida
+    
+    def test_producto_que_cambia_de_categoria(self):
+        ruta_cache = os.path.join(self.directorio, 'cache.db')
+        self.generar(ruta_cache, False)
+        
+        # El producto 3 pasa de Mouse a Laptops
+        producto = self.productos[2]
+        producto['categorias'] = [{'clave': 'Laptops'}]
+        producto['updatedAt'] += timedelta(days=1)
+        
+        incremental = self.generar(ruta_cache, True)
+        self.assertNotIn('SKU3', incremental['Mouse'])
+        self.assertIn('SKU3', incremental['Laptops'])
+        # La siguiente ejecución incremental (sin volver a consultarlo) tampoco lo deja en Mouse
+        self.assertEqual(self.generar(ruta_cache, True), incremental)
+        self.assertEqual(self.generar(os.path.join(self.directorio, 'completa.db'), False), incremental)
+    
+    def test_cambio_de_sku(self):
+        ruta_cache = os.path.join(self.directorio, 'cache.db')
+        self.generar(ruta_cache, False)
+        
+        producto = self.productos[4]
+        producto['sku'] = 'SKU-NUEVO'
+        producto['updatedAt'] += timedelta(days=1)
+        # También cambia un producto de Laptops, así avanzan las marcas de agua de los dos tipos
+        self.productos[5]['updatedAt'] += timedelta(days=1)
+        
+        self.generar(ruta_cache, True)
+        # En la ejecución siguiente el producto sale del cache, ya con el SKU nuevo
+        salida = self.generar(ruta_cache, True)
+        self.assertIn('SKU-NUEVO', salida['Mouse'])
+        self.assertNotIn('SKU5', salida['Mouse'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+# Pruebas de las peticiones al servicio de nombres (sin HTTP ni MongoDB)
+import unittest
+from generador_nombres.servicio import atender_peticion, crear_estado_servicio, ErrorPeticion
+
+class PruebaVistaPrevia(unittest.TestCase):
+    def setUp(self):
+        self.servicio = crear_estado_servicio(None, [])
+    
+    # Atiende un POST /vista-previa y devuelve el código y el mensaje del error
+    def error_vista_previa(self, datos):
+        with self.assertRaises(ErrorPeticion) as contexto:
+            atender_peticion(self.servicio, 'POST', '/vista-previa', datos)
+        return contexto.exception.codigo, str(contexto.exception)
+    
+    def test_schema_con_estructura_invalida(self):
+        schema = {'coleccion': 'productos', 'tipo': 'Mouse',
+                  'estructuraNombreProducto': [{'campo': 'especificaciones', 'condicion': {}}, 'marca']}
+        codigo, mensaje = self.error_vista_previa({'schema': schema})
+        self.assertEqual(codigo, 400)
+        self.assertIn('tituloSeccion', mensaje)
+    
+    def test_schema_sin_campos_requeridos(self):
+        codigo, _ = self.error_vista_previa({'schema': {'tipo': 'Mouse'}})
+        self.assertEqual(codigo, 400)
+    
+    def test_tipo_y_muestra_invalidos(self):
+        self.assertEqual(self.error_vista_previa({'tipo': ['Mouse']})[0], 400)
+        schema = {'coleccion': 'productos', 'tipo': 'Mouse', 'estructuraNombreProducto': [{'campo': 'marca'}]}
+        self.assertEqual(self.error_vista_previa({'schema': schema, 'muestra': 0})[0], 400)
+
+if __name__ == '__main__':
+    unittest.main()